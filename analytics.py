@@ -0,0 +1,113 @@
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+
+def _ratio(numerator, denominator):
+    """Element-wise numerator / denominator, with None where the denominator is zero."""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    result = np.divide(numerator, denominator, out=np.full(numerator.shape, np.nan), where=denominator > 0)
+    return [None if np.isnan(value) else round(float(value), 4) for value in result]
+
+def entry_columns(rows):
+    """Turn (line_number, from_time, to_time, planned, actual, total_loss_time) rows into arrays."""
+    count = len(rows)
+    return {
+        'line_number': np.fromiter((row[0] for row in rows), dtype=np.int64, count=count),
+        'from_minutes': np.fromiter((row[1].hour * 60 + row[1].minute for row in rows), dtype=np.int64, count=count),
+        'to_minutes': np.fromiter((row[2].hour * 60 + row[2].minute for row in rows), dtype=np.int64, count=count),
+        'planned': np.fromiter((row[3] for row in rows), dtype=np.float64, count=count),
+        'actual': np.fromiter((row[4] for row in rows), dtype=np.float64, count=count),
+        'total_loss_time': np.fromiter((row[5] for row in rows), dtype=np.float64, count=count)
+    }
+
+def interval_minutes(from_minutes, to_minutes):
+    """Length of each from/to interval in minutes, wrapping past midnight."""
+    return (np.asarray(to_minutes) - np.asarray(from_minutes)) % MINUTES_PER_DAY
+
+def line_summary(line_numbers, planned, actual, total_loss_time, from_minutes, to_minutes, nominal_rates=None):
+    """Per line attainment, availability and, where a nominal rate is known, performance and OEE.
+
+    All arguments except nominal_rates are equal-length arrays with one element per entry.
+    nominal_rates maps line number to units per hour. Quality data isn't recorded, so OEE
+    here is availability x performance.
+    """
+    nominal_rates = nominal_rates or {}
+    lines, line_codes = np.unique(np.asarray(line_numbers), return_inverse=True)
+    count = len(lines)
+
+    scheduled = interval_minutes(from_minutes, to_minutes)
+    planned_total = np.bincount(line_codes, weights=planned, minlength=count)
+    actual_total = np.bincount(line_codes, weights=actual, minlength=count)
+    loss_total = np.bincount(line_codes, weights=total_loss_time, minlength=count)
+    scheduled_total = np.bincount(line_codes, weights=scheduled, minlength=count)
+    entry_count = np.bincount(line_codes, minlength=count)
+
+    run_minutes = np.clip(scheduled_total - loss_total, 0, None)
+    rates = np.array([nominal_rates.get(int(line)) or 0 for line in lines], dtype=float)
+    attainment = _ratio(actual_total, planned_total)
+    availability = _ratio(run_minutes, scheduled_total)
+    performance = _ratio(actual_total, rates * run_minutes / 60)
+
+    summary = []
+    for index, line in enumerate(lines):
+        oee = None
+        if availability[index] is not None and performance[index] is not None:
+            oee = round(availability[index] * performance[index], 4)
+        summary.append({
+            'line_number': int(line),
+            'entries': int(entry_count[index]),
+            'planned': int(planned_total[index]),
+            'actual': int(actual_total[index]),
+            'scheduled_minutes': int(scheduled_total[index]),
+            'loss_minutes': int(loss_total[index]),
+            'attainment': attainment[index],
+            'availability': availability[index],
+            'performance': performance[index],
+            'oee': oee
+        })
+    return summary
+
+def loss_pareto(reasons, loss_time):
+    """Loss minutes per reason, largest first, with each reason's cumulative share."""
+    if len(reasons) == 0:
+        return []
+    labels, codes = np.unique(np.asarray(reasons, dtype=object), return_inverse=True)
+    minutes = np.bincount(codes, weights=loss_time, minlength=len(labels))
+    occurrences = np.bincount(codes, minlength=len(labels))
+
+    order = np.argsort(-minutes, kind='stable')
+    total = minutes.sum()
+    cumulative = np.cumsum(minutes[order]) / total if total > 0 else np.zeros(len(order))
+
+    return [{
+        'reason': str(labels[index]),
+        'occurrences': int(occurrences[index]),
+        'loss_minutes': int(minutes[index]),
+        'cumulative_share': round(float(share), 4)
+    } for index, share in zip(order, cumulative)]
+
+def hourly_heatmap(line_numbers, from_minutes, planned, actual, total_loss_time):
+    """Planned, actual and loss totals per line per hour of day (by interval start)."""
+    if len(line_numbers) == 0:
+        return {}
+    lines, line_codes = np.unique(np.asarray(line_numbers), return_inverse=True)
+    cells = line_codes * 24 + np.asarray(from_minutes) // 60
+    size = len(lines) * 24
+
+    def grid(weights):
+        return np.bincount(cells, weights=weights, minlength=size).reshape(len(lines), 24)
+
+    planned_grid = grid(planned)
+    actual_grid = grid(actual)
+    loss_grid = grid(total_loss_time)
+
+    return {
+        int(line): {
+            'planned': planned_grid[index].astype(int).tolist(),
+            'actual': actual_grid[index].astype(int).tolist(),
+            'loss_minutes': loss_grid[index].astype(int).tolist(),
+            'attainment': _ratio(actual_grid[index], planned_grid[index])
+        }
+        for index, line in enumerate(lines)
+    }
@@ -1,16 +1,35 @@
 import os
-from datetime import datetime, date, timedelta
-from io import BytesIO
+import base64
+import csv
+import functools
+import gzip
+import heapq
+import itertools
+import json
+import multiprocessing
+import hashlib
+import queue
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import time as time_module
+from datetime import datetime, date, time, timedelta
+from io import StringIO
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
-from flask import Flask, render_template, request, jsonify, send_file, g
+import click
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context, g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from sqlalchemy import delete, event, insert, inspect, select, text, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 from dotenv import load_dotenv
+import metrics
+import log_pipeline
 
 # Load environment variables
 load_dotenv()
@@ -18,22 +37,36 @@ load_dotenv()
 app = Flask(__name__)
 
 # Configure logging
-if os.getenv('FLASK_ENV') == 'production':
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s [%(levelname)s] %(message)s - [in %(pathname)s:%(lineno)d]'
+app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO').upper()
+app.config['LOG_MAX_BYTES'] = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+app.config['LOG_QUEUE_SIZE'] = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+# Fraction of successful request access records that are kept
+app.config['LOG_REQUEST_SAMPLE_RATE'] = float(os.getenv('LOG_REQUEST_SAMPLE_RATE', 0.1))
+
+def configure_app_logging():
+    # Application records are queued and written as JSON lines by a background thread,
+    # so request threads never wait on stdout or the log file
+    if os.getenv('FLASK_ENV') == 'production':
+        logging.basicConfig(
+            level=logging.WARNING,
+            format='%(asctime)s [%(levelname)s] %(message)s - [in %(pathname)s:%(lineno)d]'
+        )
+        log_file = None  # stdout
+    else:
+        if not os.path.exists('logs'):
+            os.mkdir('logs')
+        log_file = 'logs/planvsactual.log'
+    
+    listener = log_pipeline.configure_logging(
+        app.logger,
+        log_file=log_file,
+        max_bytes=app.config['LOG_MAX_BYTES'],
+        sample_rate=app.config['LOG_REQUEST_SAMPLE_RATE'],
+        queue_size=app.config['LOG_QUEUE_SIZE'],
+        level=app.config['LOG_LEVEL']
     )
-else:
-    if not os.path.exists('logs'):
-        os.mkdir('logs')
-    file_handler = RotatingFileHandler('logs/planvsactual.log', maxBytes=10240, backupCount=10)
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s [%(levelname)s] %(message)s - [in %(pathname)s:%(lineno)d]'
-    ))
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.setLevel(logging.INFO)
-    app.logger.info('PlanVsActual startup')
+    atexit.register(listener.stop)  # Flush queued records on shutdown
+    return listener
 
 # Database Configuration
 database_url = os.getenv('DATABASE_URL')
@@ -49,39 +82,154 @@ if database_url.startswith('postgres://'):
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'default-secret-key')
-app.config['SQLALCHEMY_POOL_SIZE'] = 10
-app.config['SQLALCHEMY_MAX_OVERFLOW'] = 10
-app.config['SQLALCHEMY_POOL_RECYCLE'] = 300
-app.config['SQLALCHEMY_POOL_TIMEOUT'] = 30
 
-# Log database configuration (without credentials)
+# Connection pool settings. Flask-SQLAlchemy 3.1 only passes SQLALCHEMY_ENGINE_OPTIONS to
+# create_engine(); pool_pre_ping validates connections on checkout instead of per request.
+engine_options = {
+    'pool_pre_ping': True,
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 300))
+}
+if not database_url.startswith('sqlite'):
+    engine_options.update({
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30))
+    })
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+# PDF report rendering and caching
+app.config['REPORT_WORKERS'] = int(os.getenv('REPORT_WORKERS', 2))
+# Render PDFs in this many separate processes instead of the calling thread (0 disables)
+app.config['REPORT_PROCESSES'] = int(os.getenv('REPORT_PROCESSES', 0))
+app.config['REPORT_CACHE_DIR'] = os.getenv(
+    'REPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'planvsactual-reports')
+)
+app.config['REPORT_CACHE_MAX_FILES'] = int(os.getenv('REPORT_CACHE_MAX_FILES', 200))
+
+# Rows fetched per round trip by streaming exports
+app.config['EXPORT_BATCH_SIZE'] = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+# Entries inserted per transaction by the bulk ingestion endpoint
+app.config['BULK_CHUNK_SIZE'] = int(os.getenv('BULK_CHUNK_SIZE', 500))
+
+# An entry sent without a shift_date whose from_time is at most this many minutes ahead
+# is taken to be the upcoming interval today rather than yesterday's
+app.config['ENTRY_UPCOMING_MINUTES'] = int(os.getenv('ENTRY_UPCOMING_MINUTES', 120))
+
+# Live dashboard feed
+app.config['STREAM_KEEPALIVE_SECONDS'] = int(os.getenv('STREAM_KEEPALIVE_SECONDS', 15))
+app.config['STREAM_POLL_SECONDS'] = int(os.getenv('STREAM_POLL_SECONDS', 5))
+app.config['STREAM_QUEUE_SIZE'] = int(os.getenv('STREAM_QUEUE_SIZE', 100))
+# Under gunicorn every open stream holds a worker thread, so the feed is capped at this many
+# streams per worker (0 serves it only through asgi.py). Dashboards without it poll instead.
+app.config['STREAM_MAX_CLIENTS'] = int(os.getenv('STREAM_MAX_CLIENTS', 0))
+app.config['DASHBOARD_POLL_SECONDS'] = int(os.getenv('DASHBOARD_POLL_SECONDS', 15))
+app.config['LIVE_FEED_NATIVE'] = False  # Set by asgi.py, which serves the feed on its event loop
+
+# Entries whose shift date is older than this many days are moved to monthly archive files
+# by `flask archive-entries`
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))
+app.config['ARCHIVE_DIR'] = os.getenv('ARCHIVE_DIR', 'archive')
+
+# Threads serving the Flask routes under the optional ASGI entry point (asgi.py)
+app.config['ASGI_WSGI_THREADS'] = int(os.getenv('ASGI_WSGI_THREADS', 10))
+
+# Per-process cache of serialized daily reports
+app.config['DAILY_REPORT_CACHE_SIZE'] = int(os.getenv('DAILY_REPORT_CACHE_SIZE', 128))
+app.config['DAILY_REPORT_CACHE_TTL'] = int(os.getenv('DAILY_REPORT_CACHE_TTL', 300))
+
+# Request and SQL instrumentation for /metrics (0 turns it off)
+app.config['METRICS_ENABLED'] = bool(int(os.getenv('METRICS_ENABLED', 1)))
+# Log requests slower than this many milliseconds with their SQL statements (0 disables)
+app.config['SLOW_REQUEST_MS'] = int(os.getenv('SLOW_REQUEST_MS', 0))
+
+# Database URL without credentials, for logging
 db_url_parts = database_url.split('@')
 if len(db_url_parts) > 1:
     safe_db_url = f"...@{db_url_parts[-1]}"
 else:
     safe_db_url = database_url
-app.logger.info(f"Database URL configured as: {safe_db_url}")
 
 db = SQLAlchemy(app)
 
+# A production line and its metadata
+class Line(db.Model):
+    number = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    shift_calendar = db.Column(db.JSON, nullable=False, default=list)  # [{"name": "A", "start": "06:00", "end": "14:00"}]
+    nominal_rate = db.Column(db.Float)  # Nominal output in units per hour
+
 class ProductionEntry(db.Model):
+    __table_args__ = (
+        db.Index('ix_production_entry_line_number_shift_date', 'line_number', 'shift_date'),  # Per line report ranges
+        db.Index('ix_production_entry_line_number_start_at', 'line_number', 'start_at'),  # Overlap lookups
+        db.Index('ix_production_entry_start_at_id', 'start_at', 'id'),  # Keyset pages of /api/entries
+        {'sqlite_autoincrement': True},  # Never reuse ids of archived entries
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.DateTime, nullable=False)
-    line_number = db.Column(db.Integer, nullable=False)  # Line 1 or Line 2
+    timestamp = db.Column(db.DateTime, nullable=False)  # When the entry was recorded
+    line_number = db.Column(db.Integer, db.ForeignKey('line.number'), nullable=False)
     from_time = db.Column(db.Time, nullable=False)
     to_time = db.Column(db.Time, nullable=False)
+    start_at = db.Column(db.DateTime)  # from_time/to_time resolved to full datetimes
+    end_at = db.Column(db.DateTime)
+    shift = db.Column(db.String(50))  # Shift name from the line's shift calendar, if any
+    shift_date = db.Column(db.Date, index=True)  # Production date the shift started on; reports group by this
     planned = db.Column(db.Integer, nullable=False)
     actual = db.Column(db.Integer, nullable=False)
     total_loss_time = db.Column(db.Integer, nullable=False, default=0)  # Total loss time in minutes
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Bumped on every update
     losses = db.relationship('LossEntry', backref='production_entry', lazy=True, cascade='all, delete-orphan')
+    
+    # Updates are issued as UPDATE ... WHERE version = <loaded version>, so a concurrent
+    # edit fails with StaleDataError instead of being overwritten. The version is bumped
+    # explicitly so loss-only edits count as changes too.
+    __mapper_args__ = {'version_id_col': version, 'version_id_generator': False}
 
 class LossEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    production_entry_id = db.Column(db.Integer, db.ForeignKey('production_entry.id'), nullable=False)
+    production_entry_id = db.Column(db.Integer, db.ForeignKey('production_entry.id'), nullable=False, index=True)
     reason = db.Column(db.String(50), nullable=False)
     loss_time = db.Column(db.Integer, nullable=False)  # Loss time in minutes
     remarks = db.Column(db.Text)
 
+# Pre-aggregated per line/day totals, maintained in the same transaction as entry writes
+class DailyLineSummary(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('line_number', 'summary_date', name='uq_daily_line_summary_line_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    line_number = db.Column(db.Integer, nullable=False)
+    summary_date = db.Column(db.Date, nullable=False, index=True)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+    planned = db.Column(db.Integer, nullable=False, default=0)
+    actual = db.Column(db.Integer, nullable=False, default=0)
+    total_loss_time = db.Column(db.Integer, nullable=False, default=0)  # Total loss time in minutes
+    version = db.Column(db.Integer, nullable=False, default=0)  # Bumped on every change to this line/day
+    losses = db.relationship('DailyLossSummary', backref='summary', lazy=True, cascade='all, delete-orphan')
+
+class DailyLossSummary(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('summary_id', 'reason', name='uq_daily_loss_summary_reason'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    summary_id = db.Column(db.Integer, db.ForeignKey('daily_line_summary.id'), nullable=False)
+    reason = db.Column(db.String(50), nullable=False)
+    occurrences = db.Column(db.Integer, nullable=False, default=0)
+    loss_time = db.Column(db.Integer, nullable=False, default=0)  # Loss time in minutes
+
+# One row per month whose entries have been moved to an archive file
+class ArchivePartition(db.Model):
+    month = db.Column(db.Date, primary_key=True)  # First day of the month
+    path = db.Column(db.String(255), nullable=False)  # File name inside ARCHIVE_DIR
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+    loss_count = db.Column(db.Integer, nullable=False, default=0)
+    sha256 = db.Column(db.String(64), nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
 # Initialize database tables
 def init_db():
     try:
@@ -96,86 +244,713 @@ def init_db():
             # Create tables
             db.create_all()
             app.logger.info("Database tables created successfully")
+            
+            # create_all() skips tables that already exist, so add any missing columns and indexes
+            ensure_columns()
+            ensure_indexes()
+            ensure_lines()
+            backfilled = backfill_entry_intervals()
+            
+            # Backfill the rollup the first time it is deployed against existing data, and
+            # rebuild it if entries were just moved onto their shift dates
+            if backfilled or (DailyLineSummary.query.first() is None and ProductionEntry.query.first() is not None):
+                rebuild_daily_summaries()
             return True
     except Exception as e:
         app.logger.error(f"Database initialization failed: {str(e)}")
         return False
 
-# Database connection handling
-def get_db():
-    if not hasattr(g, 'db_session'):
-        g.db_session = db.session
+# Add columns declared on the models that are missing from an existing database
+def ensure_columns():
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            default = f" DEFAULT {column.server_default.arg}" if column.server_default is not None else ''
+            with db.engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}'))
+            app.logger.info(f"Added column {table.name}.{column.name}")
+
+# Indexes earlier versions created that no query uses any more
+OBSOLETE_INDEXES = ('ix_production_entry_timestamp', 'ix_production_entry_line_number_timestamp')
+
+# Create indexes declared on the models that are missing from an existing database, and
+# drop obsolete ones so writes stop paying for them. On PostgreSQL both run CONCURRENTLY,
+# outside a transaction, so the release step doesn't block writes to the entry tables
+# while the previous release is still serving.
+def ensure_indexes():
+    concurrently = db.engine.dialect.name == 'postgresql'
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        if concurrently:
+            # A concurrent build that was interrupted leaves an invalid index behind, which
+            # would otherwise count as existing
+            names = [index.name for table in db.metadata.sorted_tables for index in table.indexes]
+            invalid = connection.execute(text(
+                'SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+                'WHERE NOT i.indisvalid AND c.relname = ANY(:names)'
+            ), {'names': names}).scalars().all()
+            for name in invalid:
+                connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {name}'))
+                app.logger.warning(f"Dropped invalid index {name}")
+        
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                options = index.dialect_options['postgresql']
+                options['concurrently'] = concurrently
+                try:
+                    index.create(bind=connection, checkfirst=True)
+                finally:
+                    # create_all() runs in a transaction, where CONCURRENTLY isn't allowed
+                    options['concurrently'] = False
+        
+        drop = 'DROP INDEX CONCURRENTLY IF EXISTS' if concurrently else 'DROP INDEX IF EXISTS'
+        for name in OBSOLETE_INDEXES:
+            connection.execute(text(f'{drop} {name}'))
+    app.logger.info("Database indexes verified")
+
+# Seed the line table with the original two lines plus any line that already has entries
+def ensure_lines():
+    if Line.query.first() is not None:
+        return
+    line_numbers = {1, 2} | {
+        line_number for (line_number,) in db.session.query(ProductionEntry.line_number).distinct()
+    }
+    for line_number in sorted(line_numbers):
+        db.session.add(Line(number=line_number, name=f"Line {line_number}", shift_calendar=[]))
+    db.session.commit()
+    app.logger.info(f"Created {len(line_numbers)} production lines")
+
+def line_names():
+    return {number: name for number, name in db.session.query(Line.number, Line.name).order_by(Line.number)}
+
+def shift_calendars():
+    return {number: calendar for number, calendar in db.session.query(Line.number, Line.shift_calendar)}
+
+# Entries are grouped by the production date of their shift, not the date they were recorded
+def shift_date_in_days(start_date, end_date=None):
+    return ProductionEntry.shift_date.between(start_date, end_date or start_date)
+
+# Shifts and production intervals
+#
+# from_time/to_time are clock times, so an entry always spans less than a day. That bounds
+# how far back an overlapping entry can start, which keeps overlap lookups a short range
+# scan on (line_number, start_at).
+MAX_ENTRY_SPAN = timedelta(days=1)
+
+def find_shift(calendar, from_time, name=None):
+    """Return the named shift, or the shift whose window contains from_time, or None."""
+    for shift in calendar or []:
+        if name is not None:
+            if shift['name'] == name:
+                return shift
+            continue
+        start, end = parse_hhmm(shift['start']), parse_hhmm(shift['end'])
+        if start <= end:
+            if start <= from_time < end:
+                return shift
+        elif from_time >= start or from_time < end:  # Shift runs past midnight
+            return shift
+    if name is not None:
+        raise ValueError(f'Unknown shift: {name}')
+    return None
+
+def entry_interval(from_time, to_time, calendar=None, shift_name=None, shift_date=None, now=None):
+    """Resolve clock times into (start_at, end_at, shift name, shift_date).
+    
+    shift_date is the date the shift started on, so the hours after midnight of a night
+    shift keep the previous day's date. Without a shift_date the interval is taken to be
+    the latest one starting at from_time no more than ENTRY_UPCOMING_MINUTES after now,
+    so an interval entered ahead (such as a plan for the next hour) is taken as upcoming,
+    even past midnight.
+    """
+    shift = find_shift(calendar, from_time, shift_name)
+    after_midnight = shift is not None and from_time < parse_hhmm(shift['start'])
+    
+    if shift_date is None:
+        now = now or datetime.now()
+        upcoming = now + timedelta(minutes=app.config['ENTRY_UPCOMING_MINUTES'])
+        # Start from tomorrow so an upcoming interval just past midnight is found too
+        start_at = datetime.combine(now.date() + timedelta(days=1), from_time)
+        while start_at > upcoming:
+            start_at -= timedelta(days=1)
+        shift_date = start_at.date() - timedelta(days=1) if after_midnight else start_at.date()
+    else:
+        start_at = datetime.combine(shift_date + timedelta(days=1) if after_midnight else shift_date, from_time)
+    
+    end_at = datetime.combine(start_at.date(), to_time)
+    if end_at < start_at:
+        end_at += timedelta(days=1)
+    return start_at, end_at, shift['name'] if shift else None, shift_date
+
+def parse_shift_date(value):
+    if value in (None, ''):
+        return None
     try:
-        # Test connection with database-agnostic query
-        g.db_session.execute(text('SELECT 1'))
-        g.db_session.commit()
-    except Exception as e:
-        app.logger.error(f"Database connection error: {str(e)}")
-        g.db_session.rollback()
-        # Close and remove the session
-        g.db_session.close()
-        delattr(g, 'db_session')
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError('shift_date must be YYYY-MM-DD')
+
+def find_overlapping_entries(line_number, start_at, end_at, exclude_id=None):
+    """Ids of the line's entries whose interval intersects [start_at, end_at)."""
+    query = db.session.query(ProductionEntry.id).filter(
+        ProductionEntry.line_number == line_number,
+        ProductionEntry.start_at > start_at - MAX_ENTRY_SPAN,
+        ProductionEntry.start_at < end_at,
+        ProductionEntry.end_at > start_at
+    )
+    if exclude_id is not None:
+        query = query.filter(ProductionEntry.id != exclude_id)
+    overlaps = [entry_id for (entry_id,) in query.order_by(ProductionEntry.start_at)]
+    
+    # Late entries can fall in a month that has already been archived
+    overlaps.extend(
+        entry_id for _, archived_end, entry_id in archived_intervals(line_number, start_at, end_at)
+        if archived_end > start_at and entry_id != exclude_id and entry_id not in overlaps
+    )
+    return overlaps
+
+def sweep_overlaps(intervals):
+    """Yield (item, other) for overlapping intervals among (start, end, item) tuples.
+    
+    The tuples must be sorted by (start, end). Every interval that overlaps another is
+    reported at least once, paired with the interval that reaches furthest so far, so a
+    single pass after sorting finds them all: O(n log n) overall.
+    """
+    furthest = None
+    for start, end, item in intervals:
+        if furthest is not None and start < furthest[1]:
+            yield item, furthest[2]
+        if furthest is None or end > furthest[1]:
+            furthest = (start, end, item)
+
+def backfill_entry_intervals(batch_size=1000):
+    """Fill in start_at/end_at/shift/shift_date for entries recorded before they existed.
+    
+    Each interval is taken to be the most recent one starting at from_time before the entry
+    was recorded. Returns the number of entries updated.
+    """
+    if ProductionEntry.query.filter(ProductionEntry.start_at.is_(None)).first() is None:
+        return 0
+    
+    calendars = shift_calendars()
+    count = 0
+    while True:
+        entries = ProductionEntry.query.filter(ProductionEntry.start_at.is_(None)).limit(batch_size).all()
+        if not entries:
+            break
+        for entry in entries:
+            entry.start_at, entry.end_at, entry.shift, entry.shift_date = entry_interval(
+                entry.from_time, entry.to_time, calendars.get(entry.line_number), now=entry.timestamp
+            )
+        db.session.commit()
+        count += len(entries)
+    app.logger.info(f"Backfilled production intervals for {count} entries")
+    return count
+
+# Daily summary rollup
+def dialect_insert(model):
+    """INSERT for the current database, with on_conflict_do_update() available."""
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+def apply_summary_delta(line_number, summary_date, planned, actual, total_loss_time, losses, sign=1, entries=1):
+    """Add (sign=1) or remove (sign=-1) the contribution of `entries` entries to the rollup.
+    
+    losses is an iterable of (reason, loss_time) pairs. Must be called inside the
+    transaction that writes the entries so the rollup commits or rolls back with them.
+    """
+    apply_rollup_delta(line_number, summary_date, sign * entries, sign * planned, sign * actual,
+                       sign * total_loss_time, add_reason_deltas({}, losses, sign))
+
+def add_reason_deltas(reason_deltas, losses, sign=1):
+    """Add (reason, loss_time) pairs to reason_deltas, a map of reason to (occurrences, loss_time)."""
+    for reason, loss_time in losses:
+        occurrences, minutes = reason_deltas.get(reason, (0, 0))
+        reason_deltas[reason] = (occurrences + sign, minutes + sign * loss_time)
+    return reason_deltas
+
+def apply_rollup_delta(line_number, summary_date, entries, planned, actual, total_loss_time, reason_deltas):
+    """Add signed totals to a line/day rollup row, bumping its version even when they are zero.
+    
+    reason_deltas maps reason to signed (occurrences, loss_time); reasons whose totals don't
+    move are skipped.
+    """
+    # Upsert and increment in SQL, so concurrent writers to the same line/day neither lose
+    # updates nor collide on the unique constraint when both create its first row
+    stmt = dialect_insert(DailyLineSummary).values(
+        line_number=line_number,
+        summary_date=summary_date,
+        entry_count=entries,
+        planned=planned,
+        actual=actual,
+        total_loss_time=total_loss_time,
+        version=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['line_number', 'summary_date'],
+        set_={
+            'entry_count': DailyLineSummary.entry_count + stmt.excluded.entry_count,
+            'planned': DailyLineSummary.planned + stmt.excluded.planned,
+            'actual': DailyLineSummary.actual + stmt.excluded.actual,
+            'total_loss_time': DailyLineSummary.total_loss_time + stmt.excluded.total_loss_time,
+            'version': DailyLineSummary.version + 1
+        }
+    ).returning(DailyLineSummary.id, DailyLineSummary.version)
+    summary_id, version = db.session.execute(stmt).one()
+    
+    # Each upsert bumps the row's version by exactly one; remember the versions before and
+    # after this transaction so the live feed can tell its own writes from other workers'
+    written = db.session.info.setdefault('summary_versions', {})
+    key = (line_number, summary_date)
+    written[key] = (written[key][0] if key in written else version - 1, version)
+    
+    reason_rows = [
+        {'summary_id': summary_id, 'reason': reason, 'occurrences': occurrences, 'loss_time': minutes}
+        for reason, (occurrences, minutes) in sorted(reason_deltas.items())
+        if occurrences or minutes
+    ]
+    if not reason_rows:
+        return
+    
+    stmt = dialect_insert(DailyLossSummary)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['summary_id', 'reason'],
+        set_={
+            'occurrences': DailyLossSummary.occurrences + stmt.excluded.occurrences,
+            'loss_time': DailyLossSummary.loss_time + stmt.excluded.loss_time
+        }
+    )
+    db.session.execute(stmt, reason_rows)
+
+def forget_summary_versions(session, previous_transaction):
+    session.info.pop('summary_versions', None)
+
+# Versions written by a transaction that rolled back were never seen by anyone
+event.listen(db.session, 'after_soft_rollback', forget_summary_versions)
+
+def apply_entry_to_summary(entry, sign=1):
+    apply_summary_delta(
+        entry.line_number,
+        entry.shift_date,
+        entry.planned,
+        entry.actual,
+        entry.total_loss_time,
+        [(loss.reason, loss.loss_time) for loss in entry.losses],
+        sign
+    )
+
+def aggregate_daily_totals(date_filter=None):
+    """Recompute per line/day totals from the raw entries with GROUP BY queries.
+    
+    Returns ({(line, date): (entry_count, planned, actual, total_loss_time)},
+             {(line, date, reason): (occurrences, loss_time)}).
+    """
+    entry_date = ProductionEntry.shift_date
+    
+    daily_query = db.session.query(
+        ProductionEntry.line_number,
+        entry_date,
+        db.func.count(ProductionEntry.id),
+        db.func.sum(ProductionEntry.planned),
+        db.func.sum(ProductionEntry.actual),
+        db.func.sum(ProductionEntry.total_loss_time)
+    )
+    loss_query = db.session.query(
+        ProductionEntry.line_number,
+        entry_date,
+        LossEntry.reason,
+        db.func.count(LossEntry.id),
+        db.func.sum(LossEntry.loss_time)
+    ).join(LossEntry, LossEntry.production_entry_id == ProductionEntry.id)
+    
+    if date_filter is not None:
+        daily_query = daily_query.filter(date_filter)
+        loss_query = loss_query.filter(date_filter)
+    
+    daily_totals = {
+        (line_number, _as_date(day)): (count, planned or 0, actual or 0, total_loss_time or 0)
+        for line_number, day, count, planned, actual, total_loss_time
+        in daily_query.group_by(ProductionEntry.line_number, entry_date)
+    }
+    loss_totals = {
+        (line_number, _as_date(day), reason): (count, loss_time or 0)
+        for line_number, day, reason, count, loss_time
+        in loss_query.group_by(ProductionEntry.line_number, entry_date, LossEntry.reason)
+    }
+    return daily_totals, loss_totals
+
+def read_daily_summaries(start_date=None, end_date=None, line_numbers=None):
+    """Read the rollup in the same shape as aggregate_daily_totals()."""
+    daily_query = db.session.query(
+        DailyLineSummary.line_number,
+        DailyLineSummary.summary_date,
+        DailyLineSummary.entry_count,
+        DailyLineSummary.planned,
+        DailyLineSummary.actual,
+        DailyLineSummary.total_loss_time
+    ).filter(DailyLineSummary.entry_count > 0)
+    loss_query = db.session.query(
+        DailyLineSummary.line_number,
+        DailyLineSummary.summary_date,
+        DailyLossSummary.reason,
+        DailyLossSummary.occurrences,
+        DailyLossSummary.loss_time
+    ).join(DailyLossSummary, DailyLossSummary.summary_id == DailyLineSummary.id
+    ).filter(DailyLossSummary.occurrences > 0)
+    
+    if start_date is not None:
+        date_filter = DailyLineSummary.summary_date.between(start_date, end_date or start_date)
+        daily_query = daily_query.filter(date_filter)
+        loss_query = loss_query.filter(date_filter)
+    if line_numbers:
+        daily_query = daily_query.filter(DailyLineSummary.line_number.in_(line_numbers))
+        loss_query = loss_query.filter(DailyLineSummary.line_number.in_(line_numbers))
+    
+    daily_totals = {
+        (line_number, summary_date): (count, planned, actual, total_loss_time)
+        for line_number, summary_date, count, planned, actual, total_loss_time in daily_query
+    }
+    loss_totals = {
+        (line_number, summary_date, reason): (occurrences, loss_time)
+        for line_number, summary_date, reason, occurrences, loss_time in loss_query
+    }
+    return daily_totals, loss_totals
+
+def rebuild_daily_summaries():
+    """Replace the rollup with a full recompute from the raw and archived entries."""
+    daily_totals, loss_totals = add_archived_totals(*aggregate_daily_totals(), archived_records())
+    
+    # Carry versions forward so anything keyed on them sees the rebuild as a change
+    previous_versions = {
+        (line_number, summary_date): version
+        for line_number, summary_date, version in db.session.query(
+            DailyLineSummary.line_number, DailyLineSummary.summary_date, DailyLineSummary.version
+        )
+    }
+    
+    DailyLossSummary.query.delete()
+    DailyLineSummary.query.delete()
+    
+    summaries = {}
+    for (line_number, summary_date), (count, planned, actual, total_loss_time) in daily_totals.items():
+        summary = DailyLineSummary(
+            line_number=line_number,
+            summary_date=summary_date,
+            entry_count=count,
+            planned=planned,
+            actual=actual,
+            total_loss_time=total_loss_time,
+            version=previous_versions.get((line_number, summary_date), 0) + 1
+        )
+        summaries[(line_number, summary_date)] = summary
+        db.session.add(summary)
+    
+    for (line_number, summary_date, reason), (occurrences, loss_time) in loss_totals.items():
+        summaries[(line_number, summary_date)].losses.append(DailyLossSummary(
+            reason=reason,
+            occurrences=occurrences,
+            loss_time=loss_time
+        ))
+    
+    db.session.commit()
+    app.logger.info(f"Rebuilt daily summaries for {len(summaries)} line/day pairs")
+    return len(summaries)
+
+def check_daily_summaries():
+    """Compare the rollup against a full recompute and return a list of mismatches."""
+    expected_daily, expected_losses = add_archived_totals(*aggregate_daily_totals(), archived_records())
+    actual_daily, actual_losses = read_daily_summaries()
+    
+    mismatches = []
+    for key in sorted(set(expected_daily) | set(actual_daily)):
+        if expected_daily.get(key) != actual_daily.get(key):
+            mismatches.append({'key': key, 'expected': expected_daily.get(key), 'rollup': actual_daily.get(key)})
+    for key in sorted(set(expected_losses) | set(actual_losses)):
+        if expected_losses.get(key) != actual_losses.get(key):
+            mismatches.append({'key': key, 'expected': expected_losses.get(key), 'rollup': actual_losses.get(key)})
+    return mismatches
+
+# Archival
+#
+# Entries whose shift date is older than ARCHIVE_AFTER_DAYS are moved out of the hot
+# tables a month at a time, into one gzipped NDJSON file per month (one entry per line,
+# its losses nested). Their daily totals stay in the rollup, which report totals already
+# come from; loss details for reports and exports are read back from the files.
+def month_start(day):
+    return day.replace(day=1)
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def archive_path(month):
+    return os.path.join(app.config['ARCHIVE_DIR'], f"entries-{month:%Y-%m}.ndjson.gz")
+
+def archive_record(entry):
+    return {
+        'id': entry.id,
+        'timestamp': entry.timestamp.isoformat(),
+        'line_number': entry.line_number,
+        'shift': entry.shift,
+        'shift_date': entry.shift_date.isoformat(),
+        'start_at': entry.start_at.isoformat(),
+        'end_at': entry.end_at.isoformat(),
+        'from_time': entry.from_time.strftime('%H:%M'),
+        'to_time': entry.to_time.strftime('%H:%M'),
+        'planned': entry.planned,
+        'actual': entry.actual,
+        'total_loss_time': entry.total_loss_time,
+        'version': entry.version,
+        'losses': [{
+            'id': loss.id,
+            'reason': loss.reason,
+            'loss_time': loss.loss_time,
+            'remarks': loss.remarks
+        } for loss in sorted(entry.losses, key=lambda loss: loss.id)]
+    }
+
+def read_archive(month):
+    with gzip.open(archive_path(month), 'rt', encoding='utf-8') as archive_file:
+        for line in archive_file:
+            yield json.loads(line)
+
+def stage_archive(month, records):
+    """Write records to a temporary file next to the month's archive file.
+    
+    Returns (temp_path, sha256); the caller publishes it with publish_archive().
+    """
+    path = archive_path(month)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, 'wb') as raw_file:
+            with gzip.GzipFile(fileobj=raw_file, mode='wb', mtime=0) as archive_file:
+                for record in records:
+                    archive_file.write((json.dumps(record) + '\n').encode('utf-8'))
+            raw_file.flush()
+            os.fsync(raw_file.fileno())
+        with open(temp_path, 'rb') as written:
+            for chunk in iter(lambda: written.read(1 << 16), b''):
+                digest.update(chunk)
+        os.chmod(temp_path, 0o644)
+    except BaseException:
+        os.remove(temp_path)
         raise
+    return temp_path, digest.hexdigest()
 
-@app.before_request
-def before_request():
+def publish_archive(month, temp_path):
+    """Atomically replace the month's archive file with temp_path.
+    
+    Returns the path of a copy of the file it replaced, or None if there was none, for
+    restore_archive() to put back.
+    """
+    path = archive_path(month)
+    backup_path = None
+    if os.path.exists(path):
+        backup_path = temp_path + '.previous'
+        shutil.copyfile(path, backup_path)
+    os.replace(temp_path, path)
+    return backup_path
+
+def restore_archive(month, backup_path):
+    if backup_path is None:
+        os.remove(archive_path(month))
+    else:
+        os.replace(backup_path, archive_path(month))
+
+def archived_records(start_date=None, end_date=None, line_numbers=None):
+    """Yield archived entry records in (start_at, id) order, optionally filtered."""
+    query = db.session.query(ArchivePartition.month).order_by(ArchivePartition.month)
+    if start_date is not None:
+        end_date = end_date or start_date
+        query = query.filter(ArchivePartition.month.between(month_start(start_date), end_date))
+    months = [month for (month,) in query]
+    
+    first_day = start_date.isoformat() if start_date is not None else None
+    last_day = end_date.isoformat() if start_date is not None else None
+    
+    def month_records(month):
+        for record in read_archive(month):
+            if first_day is not None and not first_day <= record['shift_date'] <= last_day:
+                continue
+            if line_numbers and record['line_number'] not in line_numbers:
+                continue
+            yield record
+    
+    # Each file is sorted; merging them keeps night shifts that cross a month boundary in order
+    yield from heapq.merge(
+        *(month_records(month) for month in months),
+        key=lambda record: (record['start_at'], record['id'])
+    )
+
+def archived_intervals(line_number, earliest, latest):
+    """(start_at, end_at, id) of the line's archived entries starting in (earliest - MAX_ENTRY_SPAN, latest)."""
+    # A shift date is at most a day before its interval's start
+    first_day = (earliest - MAX_ENTRY_SPAN).date() - timedelta(days=1)
+    for record in archived_records(first_day, latest.date(), [line_number]):
+        start_at = datetime.fromisoformat(record['start_at'])
+        if earliest - MAX_ENTRY_SPAN < start_at < latest:
+            yield start_at, datetime.fromisoformat(record['end_at']), record['id']
+
+def add_archived_totals(daily_totals, loss_totals, records):
+    """Add archived entry records to totals shaped like aggregate_daily_totals()."""
+    for record in records:
+        key = (record['line_number'], date.fromisoformat(record['shift_date']))
+        count, planned, actual, total_loss_time = daily_totals.get(key, (0, 0, 0, 0))
+        daily_totals[key] = (
+            count + 1,
+            planned + record['planned'],
+            actual + record['actual'],
+            total_loss_time + record['total_loss_time']
+        )
+        for loss in record['losses']:
+            loss_key = key + (loss['reason'],)
+            occurrences, loss_time = loss_totals.get(loss_key, (0, 0))
+            loss_totals[loss_key] = (occurrences + 1, loss_time + loss['loss_time'])
+    return daily_totals, loss_totals
+
+def archive_month(month, batch_size=500):
+    """Move the month's entries into its archive file and return how many were moved.
+    
+    Records already in the file are kept and the month's remaining entries merged in by
+    (id, timestamp), so late entries for an archived month are picked up by the next run.
+    The timestamp is part of the key because tables created before AUTOINCREMENT may reuse
+    archived ids. The new file only replaces the old one once its rows are deleted, and the
+    old one is put back if the commit fails, so an entry is never read from both the table
+    and the file and a failed run can simply be repeated.
+    """
+    end_date = next_month(month) - timedelta(days=1)
+    date_filter = shift_date_in_days(month, end_date)
+    entries = ProductionEntry.query.options(selectinload(ProductionEntry.losses)).filter(date_filter).all()
+    if not entries:
+        return 0
+    
+    hot = {(entry.id, entry.timestamp.isoformat()): archive_record(entry) for entry in entries}
+    archived = {}
+    if os.path.exists(archive_path(month)):
+        archived = {
+            key: record for record in read_archive(month)
+            if (key := (record['id'], record['timestamp'])) not in hot
+        }
+    
+    # Once the rows are gone the rollup is the only source of these days' totals
+    expected = add_archived_totals(*aggregate_daily_totals(date_filter), archived.values())
+    if expected != read_daily_summaries(month, end_date):
+        raise RuntimeError(f"Daily summaries for {month:%Y-%m} don't match its entries, run `flask check-summaries`")
+    
+    records = sorted({**archived, **hot}.values(), key=lambda record: (record['start_at'], record['id']))
+    temp_path, sha256 = stage_archive(month, records)
+    backup_path = None
     try:
-        get_db()
-    except Exception:
-        return jsonify({
-            'status': 'error',
-            'message': 'Database connection error',
-            'timestamp': datetime.now().isoformat()
-        }), 503
-
-@app.teardown_appcontext
-def teardown_db(exception=None):
-    db_session = getattr(g, 'db_session', None)
-    if db_session is not None:
-        db_session.close()
+        # Delete only the versions that were written, so an edit made meanwhile isn't lost
+        db.session.expunge_all()
+        versions = [(record['id'], record['version']) for record in hot.values()]
+        for offset in range(0, len(versions), batch_size):
+            chunk = versions[offset:offset + batch_size]
+            entry_ids = [entry_id for entry_id, _ in chunk]
+            db.session.execute(delete(LossEntry).where(LossEntry.production_entry_id.in_(entry_ids)))
+            result = db.session.execute(
+                delete(ProductionEntry).where(tuple_(ProductionEntry.id, ProductionEntry.version).in_(chunk))
+            )
+            if result.rowcount != len(chunk):
+                raise RuntimeError(f"Entries for {month:%Y-%m} changed while archiving, run it again")
+        
+        partition = db.session.get(ArchivePartition, month) or ArchivePartition(month=month)
+        partition.path = os.path.basename(archive_path(month))
+        partition.entry_count = len(records)
+        partition.loss_count = sum(len(record['losses']) for record in records)
+        partition.sha256 = sha256
+        partition.archived_at = datetime.now()
+        db.session.add(partition)
+        db.session.flush()
+        
+        backup_path = publish_archive(month, temp_path)
+        try:
+            db.session.commit()
+        except BaseException:
+            restore_archive(month, backup_path)
+            backup_path = None
+            raise
+    except BaseException:
+        db.session.rollback()
+        raise
+    finally:
+        for leftover in (temp_path, backup_path):
+            if leftover is not None and os.path.exists(leftover):
+                os.remove(leftover)
+    app.logger.info(f"Archived {len(hot)} entries for {month:%Y-%m}")
+    return len(hot)
+
+def archive_entries(older_than_days=None, today=None):
+    """Archive every month that ends more than older_than_days ago. Returns {month: entries moved}."""
+    if older_than_days is None:
+        older_than_days = app.config['ARCHIVE_AFTER_DAYS']
+    cutoff = (today or date.today()) - timedelta(days=older_than_days)
+    
+    first_day = db.session.query(db.func.min(ProductionEntry.shift_date)).scalar()
+    moved = {}
+    if first_day is None:
+        return moved
+    month = month_start(_as_date(first_day))
+    while next_month(month) <= cutoff:
+        count = archive_month(month)
+        if count:
+            moved[month] = count
+        month = next_month(month)
+    return moved
+
+def vacuum_entry_tables():
+    # Deleted rows only give their space back to the filesystem after a VACUUM
+    statement = 'VACUUM' if db.engine.dialect.name == 'sqlite' else 'VACUUM ANALYZE production_entry, loss_entry'
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text(statement))
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template(
+        'index.html',
+        lines=Line.query.order_by(Line.number).all(),
+        live_feed=app.config['LIVE_FEED_NATIVE'] or app.config['STREAM_MAX_CLIENTS'] > 0,
+        poll_seconds=app.config['DASHBOARD_POLL_SECONDS']
+    )
 
 @app.route('/api/entry', methods=['POST'])
 def add_entry():
+    data = request.get_json(silent=True)
+    line_number = data.get('line_number') if isinstance(data, dict) else None
+    app.logger.debug(f"Received production entry for Line {line_number}")
+    
+    # Validated the same way as bulk rows; an unknown line is reported by parse_entry_payload
+    line = db.session.get(Line, line_number) if type(line_number) is int else None
+    calendars = {line.number: line.shift_calendar} if line is not None else {}
+    now = datetime.now()
     try:
-        data = request.json
-        app.logger.info(f"Received production entry for Line {data.get('line_number')}")
-        
-        # Validate required fields
-        required_fields = ['line_number', 'from_time', 'to_time', 'planned', 'actual']
-        for field in required_fields:
-            if field not in data:
-                app.logger.error(f"Missing required field: {field}")
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        # Create production entry
-        entry = ProductionEntry(
-            timestamp=datetime.now(),
-            line_number=data['line_number'],
-            from_time=datetime.strptime(data['from_time'], '%H:%M').time(),
-            to_time=datetime.strptime(data['to_time'], '%H:%M').time(),
-            planned=data['planned'],
-            actual=data['actual'],
-            total_loss_time=data.get('total_loss_time', 0)
-        )
-        
-        # Add losses if present
-        if 'losses' in data:
-            app.logger.info(f"Processing {len(data['losses'])} loss entries")
-            for loss_data in data['losses']:
-                loss = LossEntry(
-                    reason=loss_data['reason'],
-                    loss_time=loss_data['loss_time'],
-                    remarks=loss_data.get('remarks', '')
-                )
-                entry.losses.append(loss)
+        values, losses = parse_entry_payload(data, calendars, now)
+    except ValueError as e:
+        app.logger.error(f"Invalid production entry: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    
+    overlaps = find_overlapping_entries(values['line_number'], values['start_at'], values['end_at'])
+    if overlaps:
+        return jsonify({'error': 'Interval overlaps existing entries for this line', 'overlaps': overlaps}), 409
+    
+    try:
+        entry = ProductionEntry(timestamp=now, **values)
+        entry.losses.extend(LossEntry(**loss) for loss in losses)
         
         db.session.add(entry)
+        apply_entry_to_summary(entry)
         db.session.commit()
-        app.logger.info(f"Successfully added entry ID: {entry.id}")
+        invalidate_report_cache(entry.shift_date)
+        invalidate_daily_report_cache(entry.shift_date)
+        publish_entry_event('entry-added', entry)
+        app.logger.debug(f"Successfully added entry ID: {entry.id}")
         
         return jsonify({'success': True, 'id': entry.id})
     except Exception as e:
@@ -183,275 +958,1386 @@ def add_entry():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/entry/<int:entry_id>', methods=['GET', 'PUT'])
+# Entry updates
+#
+# Losses are diffed against the stored rows so an edit only issues the UPDATE, INSERT and
+# DELETE statements it needs, each as one executemany, instead of replacing every loss.
+ENTRY_INTERVAL_FIELDS = ('line_number', 'from_time', 'to_time', 'shift', 'shift_date')
+
+def _loss_key(reason, loss_time, remarks):
+    return (reason, loss_time, remarks or '')
+
+def diff_losses(stored, incoming):
+    """Plan the statements that turn the stored losses into the incoming ones.
+    
+    stored maps loss id to (reason, loss_time, remarks); incoming is a list of
+    (loss id or None, values) from parse_losses(). Returns (updates, inserts, deleted ids).
+    Losses sent without an id first claim an identical stored row, then any leftover
+    row, so resubmitting an unchanged list issues no statements at all.
+    """
+    unmatched = dict(stored)
+    updates = []
+    pending = []
+    for loss_id, values in incoming:
+        if loss_id is not None and loss_id in unmatched:
+            if unmatched.pop(loss_id) != _loss_key(**values):
+                updates.append(dict(values, id=loss_id))
+        else:
+            pending.append(values)
+    
+    ids_by_key = {}
+    for loss_id, key in unmatched.items():
+        ids_by_key.setdefault(key, []).append(loss_id)
+    remaining = []
+    for values in pending:
+        ids = ids_by_key.get(_loss_key(**values))
+        if ids:
+            del unmatched[ids.pop(0)]
+        else:
+            remaining.append(values)
+    
+    leftover_ids = list(unmatched)
+    inserts = []
+    for values in remaining:
+        if leftover_ids:
+            updates.append(dict(values, id=leftover_ids.pop(0)))
+        else:
+            inserts.append(values)
+    return updates, inserts, leftover_ids
+
+def parse_entry_changes(entry, data, partial):
+    """Validate a PUT (partial=False) or PATCH body into column changes and incoming losses.
+    
+    Returns (changes, losses); losses is None when the body leaves them untouched.
+    Raises ValueError with a message suitable for the client.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Entry must be a JSON object')
+    if not partial:
+        for field in ENTRY_REQUIRED_FIELDS:
+            if field not in data:
+                raise ValueError(f'Missing required field: {field}')
+        data = dict({'total_loss_time': 0, 'losses': []}, **data)
+    
+    changes = {}
+    for field in ('line_number', 'planned', 'actual', 'total_loss_time'):
+        if field in data:
+            changes[field] = _require_int(data[field], field)
+    for field in ('from_time', 'to_time'):
+        if field in data:
+            try:
+                changes[field] = parse_hhmm(data[field])
+            except (TypeError, ValueError):
+                raise ValueError('from_time and to_time must be HH:MM')
+    
+    # The interval is only resolved again when one of its inputs actually changes
+    moved = 'shift' in data or 'shift_date' in data or any(
+        field in changes and changes[field] != getattr(entry, field) for field in ENTRY_INTERVAL_FIELDS
+    )
+    if moved:
+        line = db.session.get(Line, changes.get('line_number', entry.line_number))
+        if line is None:
+            raise ValueError(f"Unknown line: {changes.get('line_number', entry.line_number)}")
+        changes['start_at'], changes['end_at'], changes['shift'], changes['shift_date'] = entry_interval(
+            changes.get('from_time', entry.from_time),
+            changes.get('to_time', entry.to_time),
+            line.shift_calendar,
+            data.get('shift'),
+            parse_shift_date(data.get('shift_date')) or entry.shift_date
+        )
+    
+    losses = parse_losses(data['losses'] or []) if 'losses' in data else None
+    return changes, losses
+
+SUMMARY_FIELDS = ('line_number', 'shift_date', 'planned', 'actual', 'total_loss_time')
+
+def update_entry(entry, changes, losses):
+    """Apply validated changes in the current transaction, keeping the rollup in step.
+    
+    An edit that changes nothing issues no statements.
+    """
+    stored = {
+        loss_id: _loss_key(reason, loss_time, remarks)
+        for loss_id, reason, loss_time, remarks in db.session.execute(
+            select(LossEntry.id, LossEntry.reason, LossEntry.loss_time, LossEntry.remarks)
+            .where(LossEntry.production_entry_id == entry.id)
+            .order_by(LossEntry.id)
+        )
+    }
+    old_losses = [(reason, loss_time) for reason, loss_time, _ in stored.values()]
+    new_losses = old_losses if losses is None else [(values['reason'], values['loss_time']) for _, values in losses]
+    
+    changes = {field: value for field, value in changes.items() if getattr(entry, field) != value}
+    updates, inserts, deleted = diff_losses(stored, losses) if losses is not None else ([], [], [])
+    if not (changes or updates or inserts or deleted):
+        return
+    
+    old = {field: getattr(entry, field) for field in SUMMARY_FIELDS}
+    for field, value in changes.items():
+        setattr(entry, field, value)
+    entry.version = entry.version + 1
+    db.session.flush()  # Fails with StaleDataError if someone else updated the entry first
+    
+    if updates or inserts or deleted:
+        if updates:
+            db.session.execute(update(LossEntry), updates)
+        if inserts:
+            db.session.execute(insert(LossEntry), [dict(values, production_entry_id=entry.id) for values in inserts])
+        if deleted:
+            db.session.execute(delete(LossEntry).where(LossEntry.id.in_(deleted)))
+        db.session.expire(entry, ['losses'])
+    
+    # One net delta per line/day, so an edit that stays on its day upserts its rollup row
+    # once (still bumping its version) and only the loss reasons whose totals moved
+    new = {field: getattr(entry, field) for field in SUMMARY_FIELDS}
+    deltas = {}
+    for sign, values, entry_losses in ((-1, old, old_losses), (1, new, new_losses)):
+        delta = deltas.setdefault((values['line_number'], values['shift_date']), {
+            'entries': 0, 'planned': 0, 'actual': 0, 'total_loss_time': 0, 'reasons': {}
+        })
+        delta['entries'] += sign
+        for field in ('planned', 'actual', 'total_loss_time'):
+            delta[field] += sign * values[field]
+        add_reason_deltas(delta['reasons'], entry_losses, sign)
+    for (line_number, shift_date), delta in deltas.items():
+        apply_rollup_delta(line_number, shift_date, delta['entries'], delta['planned'], delta['actual'],
+                           delta['total_loss_time'], delta['reasons'])
+
+@app.route('/api/entry/<int:entry_id>', methods=['GET', 'PUT', 'PATCH'])
 def manage_entry(entry_id):
     entry = ProductionEntry.query.get_or_404(entry_id)
     
     if request.method == 'GET':
-        return jsonify({
-            'id': entry.id,
-            'line_number': entry.line_number,
-            'from_time': entry.from_time.strftime('%H:%M'),
-            'to_time': entry.to_time.strftime('%H:%M'),
-            'planned': entry.planned,
-            'actual': entry.actual,
-            'total_loss_time': entry.total_loss_time,
-            'losses': [{
-                'reason': loss.reason,
-                'loss_time': loss.loss_time,
-                'remarks': loss.remarks
-            } for loss in entry.losses]
-        })
+        return jsonify(serialize_entry(entry))
+    
+    # PUT replaces the entry, PATCH changes only the fields it sends. Either may send the
+    # version it was based on; a stale version is rejected instead of overwriting.
+    data = request.get_json(silent=True)
+    expected_version = data.get('version') if isinstance(data, dict) else None
+    if expected_version is not None and expected_version != entry.version:
+        return jsonify({'error': 'Entry was changed by someone else', 'entry': serialize_entry(entry)}), 409
+    
+    try:
+        changes, losses = parse_entry_changes(entry, data, partial=request.method == 'PATCH')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if 'start_at' in changes:
+        overlaps = find_overlapping_entries(
+            changes.get('line_number', entry.line_number), changes['start_at'], changes['end_at'], exclude_id=entry.id
+        )
+        if overlaps:
+            return jsonify({'error': 'Interval overlaps existing entries for this line', 'overlaps': overlaps}), 409
+    
+    previous_shift_date = entry.shift_date
+    try:
+        update_entry(entry, changes, losses)
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Entry was changed by someone else'}), 409
+    except Exception as e:
+        app.logger.error(f"Error updating entry: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
     
-    else:  # PUT
-        data = request.json
+    invalidate_report_cache(previous_shift_date, entry.shift_date)
+    invalidate_daily_report_cache(previous_shift_date, entry.shift_date)
+    publish_entry_event('entry-updated', entry)
+    app.logger.debug(f"Successfully updated entry ID: {entry.id}")
+    return jsonify({'success': True, 'id': entry.id, 'version': entry.version})
+
+# Production lines
+def serialize_line(line):
+    return {
+        'number': line.number,
+        'name': line.name,
+        'shift_calendar': line.shift_calendar,
+        'nominal_rate': line.nominal_rate
+    }
+
+def parse_shift_calendar(shifts):
+    if not isinstance(shifts, list):
+        raise ValueError('shift_calendar must be a list of shifts')
+    calendar = []
+    for shift in shifts:
+        if not isinstance(shift, dict) or not all(key in shift for key in ('name', 'start', 'end')):
+            raise ValueError('Each shift needs a name, start and end')
         try:
-            entry.line_number = data['line_number']
-            entry.from_time = datetime.strptime(data['from_time'], '%H:%M').time()
-            entry.to_time = datetime.strptime(data['to_time'], '%H:%M').time()
-            entry.planned = data['planned']
-            entry.actual = data['actual']
-            entry.total_loss_time = data.get('total_loss_time', 0)  # Make total_loss_time optional with default 0
-            
-            # Remove existing losses
-            for loss in entry.losses:
-                db.session.delete(loss)
-            
-            # Add new losses
-            if 'losses' in data:
-                app.logger.info(f"Processing {len(data['losses'])} loss entries")
-                for loss_data in data['losses']:
-                    loss = LossEntry(
-                        reason=loss_data['reason'],
-                        loss_time=loss_data['loss_time'],
-                        remarks=loss_data.get('remarks', '')
-                    )
-                    entry.losses.append(loss)
-            
-            db.session.commit()
-            app.logger.info(f"Successfully updated entry ID: {entry.id}")
-            return jsonify({'success': True, 'id': entry.id})
+            parse_hhmm(shift['start'])
+            parse_hhmm(shift['end'])
+        except (TypeError, ValueError):
+            raise ValueError('Shift start and end must be HH:MM')
+        calendar.append({'name': str(shift['name']), 'start': shift['start'], 'end': shift['end']})
+    return calendar
+
+def apply_line_payload(line, data):
+    if 'name' in data:
+        if not data['name']:
+            raise ValueError('name must not be empty')
+        line.name = str(data['name'])[:100]
+    if 'shift_calendar' in data:
+        line.shift_calendar = parse_shift_calendar(data['shift_calendar'])
+    if 'nominal_rate' in data:
+        if data['nominal_rate'] is not None and not isinstance(data['nominal_rate'], (int, float)):
+            raise ValueError('nominal_rate must be a number')
+        line.nominal_rate = data['nominal_rate']
+
+@app.route('/api/lines', methods=['GET', 'POST'])
+def manage_lines():
+    if request.method == 'GET':
+        return jsonify([serialize_line(line) for line in Line.query.order_by(Line.number)])
+    
+    data = request.get_json(silent=True) or {}
+    number = data.get('number')
+    if isinstance(number, bool) or not isinstance(number, int) or number < 1:
+        return jsonify({'error': 'number must be a positive integer'}), 400
+    if db.session.get(Line, number) is not None:
+        return jsonify({'error': f'Line {number} already exists'}), 409
+    
+    line = Line(number=number, name=f"Line {number}", shift_calendar=[])
+    try:
+        apply_line_payload(line, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    db.session.add(line)
+    db.session.commit()
+    app.logger.info(f"Created line {number}")
+    return jsonify(serialize_line(line)), 201
+
+@app.route('/api/lines/<int:line_number>', methods=['GET', 'PUT'])
+def manage_line(line_number):
+    line = db.get_or_404(Line, line_number)
+    if request.method == 'GET':
+        return jsonify(serialize_line(line))
+    
+    try:
+        apply_line_payload(line, request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    db.session.commit()
+    app.logger.info(f"Updated line {line_number}")
+    return jsonify(serialize_line(line))
+
+# Bulk ingestion
+ENTRY_REQUIRED_FIELDS = ['line_number', 'from_time', 'to_time', 'planned', 'actual']
+
+@functools.lru_cache(maxsize=2048)
+def parse_hhmm(value):
+    return datetime.strptime(value, '%H:%M').time()
+
+def _require_int(value, field):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f'{field} must be an integer')
+    return value
+
+def parse_entry_payload(data, calendars, now):
+    """Validate one entry payload and return (entry column values, loss column values).
+    
+    calendars maps known line numbers to their shift calendars. Raises ValueError with a
+    message suitable for the client.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Entry must be a JSON object')
+    for field in ENTRY_REQUIRED_FIELDS:
+        if field not in data:
+            raise ValueError(f'Missing required field: {field}')
+    
+    try:
+        from_time = parse_hhmm(data['from_time'])
+        to_time = parse_hhmm(data['to_time'])
+    except (TypeError, ValueError):
+        raise ValueError('from_time and to_time must be HH:MM')
+    
+    line_number = _require_int(data['line_number'], 'line_number')
+    if line_number not in calendars:
+        raise ValueError(f"Unknown line: {line_number}")
+    start_at, end_at, shift, shift_date = entry_interval(
+        from_time, to_time, calendars[line_number], data.get('shift'), parse_shift_date(data.get('shift_date')), now
+    )
+    
+    values = {
+        'line_number': line_number,
+        'from_time': from_time,
+        'to_time': to_time,
+        'start_at': start_at,
+        'end_at': end_at,
+        'shift': shift,
+        'shift_date': shift_date,
+        'planned': _require_int(data['planned'], 'planned'),
+        'actual': _require_int(data['actual'], 'actual'),
+        'total_loss_time': _require_int(data.get('total_loss_time', 0), 'total_loss_time')
+    }
+    
+    losses = [values for _, values in parse_losses(data.get('losses') or [])]
+    return values, losses
+
+def parse_losses(items):
+    """Validate loss payloads into (loss id or None, column values) pairs."""
+    if not isinstance(items, list):
+        raise ValueError('losses must be a list')
+    losses = []
+    for loss_data in items:
+        if not isinstance(loss_data, dict) or 'reason' not in loss_data or 'loss_time' not in loss_data:
+            raise ValueError('Each loss needs a reason and loss_time')
+        loss_id = loss_data.get('id')
+        losses.append((_require_int(loss_id, 'loss id') if loss_id is not None else None, {
+            'reason': str(loss_data['reason'])[:50],
+            'loss_time': _require_int(loss_data['loss_time'], 'loss_time'),
+            'remarks': loss_data.get('remarks') or ''
+        }))
+    return losses
+
+def read_bulk_payload():
+    """Read a JSON array body or an NDJSON stream (one entry object per line)."""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        rows = []
+        for line in request.stream:
+            line = line.strip()
+            if line:
+                rows.append(json.loads(line))
+        return rows
+    
+    rows = request.get_json(silent=True)
+    if not isinstance(rows, list):
+        raise ValueError('Expected a JSON array of entries or an NDJSON body')
+    return rows
+
+def find_bulk_overlaps(parsed_rows):
+    """Return an error for every row whose interval overlaps another row or a stored entry.
+    
+    Per line, the stored entries that could reach the batch are read with one range scan
+    and swept together with the batch's rows.
+    """
+    rows_by_line = {}
+    for index, (values, _) in enumerate(parsed_rows):
+        rows_by_line.setdefault(values['line_number'], []).append((values['start_at'], values['end_at'], ('row', index)))
+    
+    errors = {}
+    for line_number, rows in rows_by_line.items():
+        earliest = min(start_at for start_at, _, _ in rows)
+        latest = max(end_at for _, end_at, _ in rows)
+        stored = db.session.query(ProductionEntry.start_at, ProductionEntry.end_at, ProductionEntry.id).filter(
+            ProductionEntry.line_number == line_number,
+            ProductionEntry.start_at > earliest - MAX_ENTRY_SPAN,
+            ProductionEntry.start_at < latest
+        )
+        stored = itertools.chain(stored, archived_intervals(line_number, earliest, latest))
+        intervals = rows + [(start_at, end_at, ('entry', entry_id)) for start_at, end_at, entry_id in stored]
+        intervals.sort(key=lambda interval: (interval[0], interval[1]))
         
-        except Exception as e:
-            app.logger.error(f"Error updating entry: {str(e)}")
-            db.session.rollback()
-            return jsonify({'error': str(e)}), 500
+        for item, other in sweep_overlaps(intervals):
+            for row, partner in ((item, other), (other, item)):
+                if row[0] == 'row' and row[1] not in errors:
+                    target = f"entry {partner[1]}" if partner[0] == 'entry' else f"row {partner[1]}"
+                    errors[row[1]] = {'index': row[1], 'error': f'Interval overlaps {target}'}
+    return [errors[index] for index in sorted(errors)]
 
-@app.route('/api/daily-report')
-def get_daily_report():
+def insert_entry_chunk(parsed_rows, now):
+    """Insert parsed entries and their losses with executemany inserts; returns entry ids."""
+    entry_ids = db.session.execute(
+        insert(ProductionEntry).returning(ProductionEntry.id, sort_by_parameter_order=True),
+        [dict(values, timestamp=now) for values, _ in parsed_rows]
+    ).scalars().all()
+    
+    loss_params = [
+        dict(loss, production_entry_id=entry_id)
+        for entry_id, (_, losses) in zip(entry_ids, parsed_rows)
+        for loss in losses
+    ]
+    if loss_params:
+        db.session.execute(insert(LossEntry), loss_params)
+    
+    # One rollup update per line/day in the chunk rather than per entry
+    deltas = {}
+    for values, losses in parsed_rows:
+        key = (values['line_number'], values['shift_date'])
+        delta = deltas.setdefault(key, {'entries': 0, 'planned': 0, 'actual': 0, 'total_loss_time': 0, 'losses': []})
+        delta['entries'] += 1
+        delta['planned'] += values['planned']
+        delta['actual'] += values['actual']
+        delta['total_loss_time'] += values['total_loss_time']
+        delta['losses'].extend((loss['reason'], loss['loss_time']) for loss in losses)
+    for (line_number, shift_date), delta in deltas.items():
+        apply_summary_delta(line_number, shift_date, delta['planned'], delta['actual'],
+                            delta['total_loss_time'], delta['losses'], entries=delta['entries'])
+    
+    db.session.commit()
     today = date.today()
-    entries = ProductionEntry.query.filter(
-        db.func.date(ProductionEntry.timestamp) == today
-    ).order_by(ProductionEntry.from_time).all()
+    versions = pop_summary_versions(today)
+    days = {shift_date for _, shift_date in deltas}
+    invalidate_report_cache(*days)
+    invalidate_daily_report_cache(*days)
+    
+    # One snapshot per chunk instead of an event per entry
+    if today in days and daily_feed.has_subscribers():
+        daily_feed.publish('snapshot', {'date': today.isoformat(), 'entries': daily_entries(today)}, today, versions)
+    return entry_ids
+
+@app.route('/api/entries/bulk', methods=['POST'])
+def add_entries_bulk():
+    try:
+        rows = read_bulk_payload()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid bulk payload: {str(e)}'}), 400
+    
+    # Validate everything before writing anything
+    calendars = shift_calendars()
+    now = datetime.now()
+    parsed_rows = []
+    errors = []
+    for index, data in enumerate(rows):
+        try:
+            parsed_rows.append(parse_entry_payload(data, calendars, now))
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+    if errors:
+        app.logger.error(f"Rejected bulk upload of {len(rows)} entries with {len(errors)} invalid rows")
+        return jsonify({'success': False, 'results': errors}), 400
     
-    return jsonify([{
+    errors = find_bulk_overlaps(parsed_rows)
+    if errors:
+        app.logger.error(f"Rejected bulk upload of {len(rows)} entries with {len(errors)} overlapping rows")
+        return jsonify({'success': False, 'results': errors}), 409
+    
+    results = []
+    chunk_size = app.config['BULK_CHUNK_SIZE']
+    for chunk_start in range(0, len(parsed_rows), chunk_size):
+        chunk = parsed_rows[chunk_start:chunk_start + chunk_size]
+        try:
+            entry_ids = insert_entry_chunk(chunk, now)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Bulk insert failed at row {chunk_start}: {str(e)}")
+            results.extend(
+                {'index': index, 'error': f'Not inserted: {str(e)}'}
+                for index in range(chunk_start, len(parsed_rows))
+            )
+            return jsonify({'success': False, 'results': results}), 500
+        results.extend({'index': chunk_start + offset, 'id': entry_id} for offset, entry_id in enumerate(entry_ids))
+    
+    app.logger.info(f"Bulk inserted {len(results)} entries")
+    return jsonify({'success': True, 'results': results})
+
+def serialize_entry(entry):
+    return {
         'id': entry.id,
         'line_number': entry.line_number,
         'from_time': entry.from_time.strftime('%H:%M'),
         'to_time': entry.to_time.strftime('%H:%M'),
+        'start_at': entry.start_at.isoformat(),
+        'end_at': entry.end_at.isoformat(),
+        'shift': entry.shift,
+        'shift_date': entry.shift_date.isoformat(),
         'planned': entry.planned,
         'actual': entry.actual,
         'total_loss_time': entry.total_loss_time,
+        'version': entry.version,
         'losses': [{
+            'id': loss.id,
             'reason': loss.reason,
             'loss_time': loss.loss_time,
             'remarks': loss.remarks
         } for loss in entry.losses]
-    } for entry in entries])
-
-def generate_report_data(start_date, end_date):
-    entries = ProductionEntry.query.filter(
-        db.func.date(ProductionEntry.timestamp).between(start_date, end_date)
-    ).order_by(ProductionEntry.line_number, ProductionEntry.timestamp).all()
-    
-    # Group entries by line and date
-    report_data = {1: {}, 2: {}}
-    for entry in entries:
-        entry_date = entry.timestamp.date()
-        line_data = report_data[entry.line_number]
+    }
+
+def daily_entries_select(day, line_numbers=None):
+    # Losses for all entries are loaded in one extra query rather than one per entry
+    stmt = select(ProductionEntry).options(selectinload(ProductionEntry.losses)).where(shift_date_in_days(day))
+    if line_numbers:
+        stmt = stmt.where(ProductionEntry.line_number.in_(line_numbers))
+    return stmt.order_by(ProductionEntry.start_at, ProductionEntry.id)
+
+def daily_entries(day, line_numbers=None):
+    entries = db.session.scalars(daily_entries_select(day, line_numbers)).all()
+    return [serialize_entry(entry) for entry in entries]
+
+class ResponseCache:
+    """A small thread-safe LRU cache whose entries also expire after a TTL."""
+    
+    def __init__(self, max_entries, ttl):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time_module.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time_module.monotonic() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+    
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+# Keyed by (day, line numbers). Values are (etag, serialized body).
+daily_report_cache = ResponseCache(app.config['DAILY_REPORT_CACHE_SIZE'], app.config['DAILY_REPORT_CACHE_TTL'])
+
+def invalidate_daily_report_cache(*days):
+    daily_report_cache.discard_where(lambda key: key[0] in days)
+
+def daily_report_versions(day, line_numbers):
+    """Select the (line, version) rollup rows a daily report depends on."""
+    stmt = select(DailyLineSummary.line_number, DailyLineSummary.version).where(DailyLineSummary.summary_date == day)
+    if line_numbers:
+        stmt = stmt.where(DailyLineSummary.line_number.in_(line_numbers))
+    return stmt
+
+def format_daily_report_etag(day, line_numbers, versions):
+    token = f"{day.isoformat()}|{line_numbers}|{sorted(tuple(row) for row in versions)}"
+    return hashlib.sha1(token.encode()).hexdigest()
+
+def daily_report_etag(day, line_numbers):
+    """ETag derived from the rollup versions, which every worker bumps in the write transaction."""
+    versions = db.session.execute(daily_report_versions(day, line_numbers)).all()
+    return format_daily_report_etag(day, line_numbers, versions)
+
+# Optional ?line=1,2 filter
+@app.route('/api/daily-report')
+def get_daily_report():
+    today = date.today()
+    try:
+        line_numbers = tuple(sorted(set(parse_lines_arg())))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid line filter: {str(e)}'}), 400
+    
+    # The version check is one small indexed query, so a cached body from this worker is
+    # never served after another worker has committed a change to the same day
+    etag = daily_report_etag(today, line_numbers)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        key = (today, line_numbers)
+        cached = daily_report_cache.get(key)
+        if cached is not None and cached[0] == etag:
+            body = cached[1]
+        else:
+            body = app.json.dumps(daily_entries(today, line_numbers))
+            daily_report_cache.set(key, (etag, body))
+        response = Response(body, mimetype='application/json')
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Live dashboard feed
+#
+# Each worker keeps one DailyFeed. Writes handled by this worker are published as
+# entry events, serialized once and queued to every connected dashboard. Writes made
+# by other workers are noticed by a single watcher thread that polls today's rollup
+# version of each line and, when one differs from the version this worker last saw or
+# wrote itself, pushes one fresh snapshot to all clients.
+class DailyFeed:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._watcher = None
+        self._day = None
+        self._versions = None
+    
+    def subscribe(self, day, versions):
+        """Register a client whose snapshot was taken at the given {line: rollup version}."""
+        subscriber = queue.Queue(maxsize=app.config['STREAM_QUEUE_SIZE'])
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._day is None:
+                self._day, self._versions = day, dict(versions)
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name='daily-feed', daemon=True)
+                self._watcher.start()
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+    
+    def has_subscribers(self):
+        with self._lock:
+            return bool(self._subscribers)
+    
+    def is_subscribed(self, subscriber):
+        with self._lock:
+            return subscriber in self._subscribers
+    
+    def broadcast(self, message):
+        with self._lock:
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    # A stalled client is dropped; its EventSource reconnects for a fresh snapshot
+                    self._subscribers.discard(subscriber)
+    
+    def publish(self, event, payload, day, versions):
+        """Publish a change committed by this worker for the given production day.
         
-        if entry_date not in line_data:
-            line_data[entry_date] = {
-                'planned': 0,
-                'actual': 0,
-                'total_loss_time': 0,
-                'losses': {}
-            }
+        versions maps each line whose rollup row for the day the write changed to its
+        (version before, version after) from pop_summary_versions().
+        """
+        if day != date.today():
+            return
+        with self._lock:
+            if not self._subscribers:
+                return
+            if self._day == day:
+                for line_number, (before, after) in versions.items():
+                    # If another worker wrote the row since the watcher last saw it, or the
+                    # watcher already saw this write, leave it for the watcher to notice
+                    if self._versions.get(line_number, 0) == before:
+                        self._versions[line_number] = after
+        self.broadcast(format_sse(event, payload))
+    
+    def _watch(self):
+        while True:
+            time_module.sleep(app.config['STREAM_POLL_SECONDS'])
+            with self._lock:
+                if not self._subscribers:
+                    self._watcher = None
+                    self._day = self._versions = None
+                    return
+            
+            try:
+                snapshot = self.poll()
+                if snapshot:
+                    self.broadcast(snapshot)
+            except Exception as e:
+                app.logger.error(f"Daily feed watcher failed: {str(e)}")
+    
+    def poll(self):
+        """Return a snapshot message if today's rollup changed other than by this worker's writes."""
+        with app.app_context():
+            today = date.today()
+            versions = today_summary_versions(today)
+            
+            with self._lock:
+                if self._day != today:
+                    changed = self._day is not None
+                else:
+                    changed = versions != self._versions
+                self._day, self._versions = today, versions
+            
+            if changed:
+                return format_sse('snapshot', {'date': today.isoformat(), 'entries': daily_entries(today)})
+        return None
+
+def format_sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def today_summary_versions(day):
+    return dict(db.session.execute(daily_report_versions(day, ())).all())
+
+def pop_summary_versions(day):
+    """{line: (version before, version after)} of the day's rollup rows the last commit wrote."""
+    written = db.session.info.pop('summary_versions', {})
+    return {line_number: versions for (line_number, summary_date), versions in written.items() if summary_date == day}
+
+daily_feed = DailyFeed()
+
+def publish_entry_event(event, entry):
+    """Publish an entry committed by this worker. Call right after the commit."""
+    day = entry.shift_date
+    versions = pop_summary_versions(day)
+    if not daily_feed.has_subscribers():
+        return
+    daily_feed.publish(event, {'date': day.isoformat(), 'entry': serialize_entry(entry)}, day, versions)
+
+# Streams open in this worker, limited to STREAM_MAX_CLIENTS
+open_streams = 0
+open_streams_lock = threading.Lock()
+
+def acquire_stream_slot():
+    global open_streams
+    with open_streams_lock:
+        if open_streams >= app.config['STREAM_MAX_CLIENTS']:
+            return False
+        open_streams += 1
+        return True
+
+def release_stream_slot():
+    global open_streams
+    with open_streams_lock:
+        open_streams -= 1
+
+@app.route('/api/stream/daily')
+def stream_daily():
+    # Clients that are turned away fall back to polling /api/daily-report
+    if not acquire_stream_slot():
+        response = jsonify({'error': 'Live feed unavailable, poll /api/daily-report instead'})
+        response.headers['Retry-After'] = str(app.config['DASHBOARD_POLL_SECONDS'])
+        return response, 503
+    
+    try:
+        return open_daily_stream()
+    except Exception:
+        release_stream_slot()
+        raise
+
+def open_daily_stream():
+    today = date.today()
+    versions = today_summary_versions(today)
+    snapshot = format_sse('snapshot', {'date': today.isoformat(), 'entries': daily_entries(today)})
+    
+    # Don't hold a pooled connection for the lifetime of the stream
+    db.session.close()
+    subscriber = daily_feed.subscribe(today, versions)
+    keepalive = app.config['STREAM_KEEPALIVE_SECONDS']
+    
+    def generate():
+        try:
+            yield f"retry: 3000\n{snapshot}"
+            while daily_feed.is_subscribed(subscriber):
+                try:
+                    yield subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            daily_feed.unsubscribe(subscriber)
+    
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Runs even if the client goes away before the body is started
+    response.call_on_close(release_stream_slot)
+    return response
+
+def _as_date(value):
+    # SQLite returns DATE() results as ISO strings, PostgreSQL as date objects
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+def archived_occurrences(start_date, end_date, line_numbers=None):
+    """Archived loss occurrences in the row shape of generate_report_data()'s query."""
+    return [(
+        record['line_number'],
+        date.fromisoformat(record['shift_date']),
+        parse_hhmm(record['from_time']),
+        parse_hhmm(record['to_time']),
+        loss['reason'],
+        loss['loss_time'],
+        loss['remarks'],
+        datetime.fromisoformat(record['start_at']),
+        record['id'],
+        loss['id']
+    ) for record in archived_records(start_date, end_date, line_numbers) for loss in record['losses']]
+
+def generate_report_data(start_date, end_date, line_numbers=None):
+    # Only rows for the requested period (and lines, if given) are read
+    date_filter = shift_date_in_days(start_date, end_date)
+    if line_numbers:
+        date_filter = db.and_(date_filter, ProductionEntry.line_number.in_(line_numbers))
+    
+    # Per line/date totals and per reason loss totals come from the rollup
+    daily_totals, loss_totals = read_daily_summaries(start_date, end_date, line_numbers)
+    
+    # Individual loss occurrences in one joined pass, in production order
+    occurrences = db.session.query(
+        ProductionEntry.line_number,
+        ProductionEntry.shift_date,
+        ProductionEntry.from_time,
+        ProductionEntry.to_time,
+        LossEntry.reason,
+        LossEntry.loss_time,
+        LossEntry.remarks,
+        ProductionEntry.start_at,
+        ProductionEntry.id,
+        LossEntry.id
+    ).join(LossEntry, LossEntry.production_entry_id == ProductionEntry.id
+    ).filter(date_filter).order_by(
+        ProductionEntry.line_number, ProductionEntry.start_at, ProductionEntry.id, LossEntry.id
+    ).all()
+    
+    # Months moved out of the hot tables are read back from their archive files
+    archived = archived_occurrences(start_date, end_date, line_numbers)
+    if archived:
+        occurrences = sorted(occurrences + archived, key=lambda row: (row[0], row[7], row[8], row[9]))
+    
+    # Group entries by line and date; every configured line gets a section even without data
+    report_data = {
+        line_number: {} for line_number in line_names()
+        if not line_numbers or line_number in line_numbers
+    }
+    for (line_number, day), (_, planned, actual, total_loss_time) in sorted(daily_totals.items()):
+        report_data.setdefault(line_number, {})[day] = {
+            'planned': planned,
+            'actual': actual,
+            'total_loss_time': total_loss_time,
+            'losses': {}
+        }
+    
+    # Group losses by reason with time ranges and remarks
+    for line_number, day, from_time, to_time, reason, loss_time, remarks, *_ in occurrences:
+        daily_losses = report_data[line_number][day]['losses']
         
-        daily_data = line_data[entry_date]
-        daily_data['planned'] += entry.planned
-        daily_data['actual'] += entry.actual
-        daily_data['total_loss_time'] += entry.total_loss_time
+        if reason not in daily_losses:
+            daily_losses[reason] = {
+                'total_time': loss_totals[(line_number, day, reason)][1],
+                'occurrences': []
+            }
         
-        # Group losses by reason with time ranges and remarks
-        for loss in entry.losses:
-            if loss.reason not in daily_data['losses']:
-                daily_data['losses'][loss.reason] = {
-                    'total_time': 0,
-                    'occurrences': []
-                }
-            
-            loss_data = daily_data['losses'][loss.reason]
-            loss_data['total_time'] += loss.loss_time
-            loss_data['occurrences'].append({
-                'time_range': f"{entry.from_time.strftime('%H:%M')}-{entry.to_time.strftime('%H:%M')}",
-                'loss_time': loss.loss_time,
-                'remarks': loss.remarks
-            })
+        daily_losses[reason]['occurrences'].append({
+            'time_range': f"{from_time.strftime('%H:%M')}-{to_time.strftime('%H:%M')}",
+            'loss_time': loss_time,
+            'remarks': remarks
+        })
     
     return report_data
 
+def report_date_range(report_type):
+    today = date.today()
+    
+    if report_type == 'daily':
+        return today, today
+    # weekly
+    return today - timedelta(days=today.weekday()), today
+
+def parse_report_params(report_type, params):
+    """Resolve (start, end, lines) from a report type or explicit start/end/line parameters."""
+    start_date, end_date = report_date_range(report_type)
+    if params.get('start'):
+        start_date = datetime.strptime(params['start'], '%Y-%m-%d').date()
+        end_date = datetime.strptime(params['end'], '%Y-%m-%d').date() if params.get('end') else start_date
+    if end_date < start_date:
+        raise ValueError('end must not be before start')
+    
+    lines = params.get('lines') or []
+    if isinstance(lines, str):
+        lines = lines.split(',')
+    return start_date, end_date, tuple(sorted({int(line) for line in lines if line != ''}))
+
+# Report cache
+#
+# Finished PDFs are stored on disk (shared by all workers) under a key made of the
+# date range and the rollup versions of every line/day in it. Any write bumps the
+# version of its line/day, so only reports covering that day get a new key.
+def report_cache_key(start_date, end_date, line_numbers=()):
+    versions = db.session.query(
+        DailyLineSummary.line_number,
+        DailyLineSummary.summary_date,
+        DailyLineSummary.version
+    ).filter(
+        DailyLineSummary.summary_date.between(start_date, end_date)
+    )
+    if line_numbers:
+        versions = versions.filter(DailyLineSummary.line_number.in_(line_numbers))
+    versions = versions.order_by(DailyLineSummary.line_number, DailyLineSummary.summary_date).all()
+    
+    # Line names are printed in the report, so renaming a line changes the key too
+    digest = hashlib.sha256((
+        ';'.join(f"{line}:{day.isoformat()}:{version}" for line, day, version in versions) + '|' +
+        ';'.join(f"{number}:{name}" for number, name in line_names().items())
+    ).encode()).hexdigest()
+    lines_part = '_'.join(str(line) for line in line_numbers) or 'all'
+    return f"{start_date.strftime('%Y%m%d')}-{end_date.strftime('%Y%m%d')}-{lines_part}-{digest[:32]}"
+
+def parse_report_cache_key(key):
+    """Return (start, end, lines) encoded in a cache key, or None if it isn't one."""
+    try:
+        start, end, lines_part, digest = key.split('-')
+        if len(digest) != 32 or any(c not in '0123456789abcdef' for c in digest):
+            return None
+        line_numbers = () if lines_part == 'all' else tuple(int(line) for line in lines_part.split('_'))
+        return datetime.strptime(start, '%Y%m%d').date(), datetime.strptime(end, '%Y%m%d').date(), line_numbers
+    except ValueError:
+        return None
+
+def report_cache_path(key):
+    return os.path.join(app.config['REPORT_CACHE_DIR'], f"{key}.pdf")
+
+def store_cached_report(key, pdf):
+    cache_dir = app.config['REPORT_CACHE_DIR']
+    os.makedirs(cache_dir, exist_ok=True)
+    
+    # Write then rename so other workers never read a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp_file:
+        tmp_file.write(pdf)
+    os.replace(tmp_path, report_cache_path(key))
+    prune_report_cache()
+
+def prune_report_cache():
+    cache_dir = app.config['REPORT_CACHE_DIR']
+    try:
+        paths = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith('.pdf')]
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:max(0, len(paths) - app.config['REPORT_CACHE_MAX_FILES'])]:
+            os.remove(path)
+    except OSError as e:
+        app.logger.warning(f"Report cache pruning failed: {str(e)}")
+
+def invalidate_report_cache(*days):
+    """Drop cached reports whose date range covers any of the given days."""
+    cache_dir = app.config['REPORT_CACHE_DIR']
+    if not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.pdf'):
+            continue
+        params = parse_report_cache_key(name[:-len('.pdf')])
+        if params and any(params[0] <= day <= params[1] for day in days):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass  # Already removed by another worker
+
+report_process_pool = None
+report_process_pool_lock = threading.Lock()
+
+def render_pdf(report_data, start_date, end_date, names):
+    # Imported here so ReportLab is only loaded once the first report is rendered
+    from report_layout import render_report_pdf
+    
+    if not app.config['REPORT_PROCESSES']:
+        return render_report_pdf(report_data, start_date, end_date, names)
+    
+    # Rendering is pure Python and holds the GIL, so a process pool keeps it from stalling
+    # the worker's other threads (or event loop). Spawned children import only report_layout.
+    global report_process_pool
+    with report_process_pool_lock:
+        if report_process_pool is None:
+            report_process_pool = ProcessPoolExecutor(
+                max_workers=app.config['REPORT_PROCESSES'], mp_context=multiprocessing.get_context('spawn')
+            )
+    return report_process_pool.submit(render_report_pdf, report_data, start_date, end_date, names).result()
+
+def build_report(start_date, end_date, line_numbers, key):
+    report_data = generate_report_data(start_date, end_date, line_numbers)
+    names = line_names()
+    db.session.close()  # Don't hold a pooled connection while rendering
+    
+    render_started = time_module.perf_counter()
+    pdf = render_pdf(report_data, start_date, end_date, names)
+    PDF_RENDER_TIME.observe(time_module.perf_counter() - render_started)
+    store_cached_report(key, pdf)
+    return pdf
+
+def report_download_name(start_date, end_date, line_numbers=()):
+    lines_part = ''.join(f'_line{line}' for line in line_numbers)
+    return f'production_report_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}{lines_part}.pdf'
+
+# Background report jobs, keyed by report cache key
+report_executor = ThreadPoolExecutor(max_workers=app.config['REPORT_WORKERS'], thread_name_prefix='report')
+report_jobs = {}
+report_jobs_lock = threading.Lock()
+
+def _run_report_job(start_date, end_date, line_numbers, key):
+    with app.app_context():
+        try:
+            build_report(start_date, end_date, line_numbers, key)
+            app.logger.info(f"Rendered report {key}")
+        except Exception as e:
+            app.logger.error(f"Report job {key} failed: {str(e)}")
+            raise
+
+def submit_report_job(start_date, end_date, line_numbers, key):
+    """Start rendering a report unless it is already in progress; returns the job's future."""
+    with report_jobs_lock:
+        future = report_jobs.get(key)
+        if future is None or (future.done() and future.exception() is not None):
+            future = report_jobs[key] = report_executor.submit(_run_report_job, start_date, end_date, line_numbers, key)
+        
+        # Forget finished jobs; their output lives in the cache directory
+        for finished_key in [k for k, f in report_jobs.items() if f.done() and k != key]:
+            del report_jobs[finished_key]
+        return future
+
+def report_job_status(key):
+    if os.path.exists(report_cache_path(key)):
+        return 'done', None
+    future = report_jobs.get(key)
+    if future is None:
+        return None, None
+    if not future.done():
+        return 'pending', None
+    if future.exception() is not None:
+        return 'failed', str(future.exception())
+    # Rendered but since evicted or invalidated
+    return None, None
+
+def report_job_response(key, status, error=None, code=200):
+    body = {
+        'job_id': key,
+        'status': status,
+        'status_url': f"/api/report-jobs/{key}",
+        'download_url': f"/api/report-jobs/{key}/download"
+    }
+    if error:
+        body['error'] = error
+    return jsonify(body), code
+
+# Accepts 'daily' or 'weekly', optionally overridden by ?start=YYYY-MM-DD&end=YYYY-MM-DD&line=1,2
 @app.route('/api/report/<report_type>')
 def generate_report(report_type):
+    try:
+        start_date, end_date, line_numbers = parse_report_params(report_type, {
+            'start': request.args.get('start'),
+            'end': request.args.get('end'),
+            'lines': parse_lines_arg()
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid report parameters: {str(e)}'}), 400
+    key = report_cache_key(start_date, end_date, line_numbers)
+    download_name = report_download_name(start_date, end_date, line_numbers)
+    
+    cache_path = report_cache_path(key)
+    if not os.path.exists(cache_path):
+        # Identical requests wait on the same job, so a report is rendered once however many ask
+        try:
+            submit_report_job(start_date, end_date, line_numbers, key).result()
+        except Exception as e:
+            return jsonify({'error': f'Report generation failed: {str(e)}'}), 500
+    
+    try:
+        return send_file(cache_path, download_name=download_name, mimetype='application/pdf')
+    except FileNotFoundError:
+        return jsonify({'error': 'Report data changed while rendering, request it again'}), 409
+
+@app.route('/api/report-jobs', methods=['POST'])
+def create_report_job():
+    data = request.get_json(silent=True) or {}
+    try:
+        start_date, end_date, line_numbers = parse_report_params(data.get('report_type', 'daily'), data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid report parameters: {str(e)}'}), 400
+    key = report_cache_key(start_date, end_date, line_numbers)
+    
+    status, error = report_job_status(key)
+    if status == 'done':
+        return report_job_response(key, status)
+    
+    submit_report_job(start_date, end_date, line_numbers, key)
+    return report_job_response(key, 'pending', code=202)
+
+@app.route('/api/report-jobs/<job_id>')
+def get_report_job(job_id):
+    params = parse_report_cache_key(job_id)
+    if params is None:
+        return jsonify({'error': 'Unknown report job'}), 404
+    
+    status, error = report_job_status(job_id)
+    if status is None:
+        # The job may be running on another worker; resubmit here if it is still current
+        if report_cache_key(*params) != job_id:
+            return jsonify({'error': 'Report data has changed, submit a new job'}), 404
+        submit_report_job(*params, job_id)
+        status = 'pending'
+    return report_job_response(job_id, status, error)
+
+@app.route('/api/report-jobs/<job_id>/download')
+def download_report_job(job_id):
+    params = parse_report_cache_key(job_id)
+    if params is None:
+        return jsonify({'error': 'Unknown report job'}), 404
+    
+    cache_path = report_cache_path(job_id)
+    if not os.path.exists(cache_path):
+        return jsonify({'error': 'Report is not ready'}), 409
+    return send_file(cache_path, download_name=report_download_name(*params), mimetype='application/pdf')
+
+# Entry query API
+#
+# Entries are paged by keyset on (start_at, id) rather than OFFSET, so every page is an
+# index range scan starting right after the previous page's last row.
+ENTRY_PAGE_SIZE = 100
+ENTRY_PAGE_MAX = 1000
+
+def encode_cursor(row):
+    token = json.dumps([row['start_at'], row['id']]).encode()
+    return base64.urlsafe_b64encode(token).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        token = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        start_at, entry_id = json.loads(token)
+        return datetime.fromisoformat(start_at), int(entry_id)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+@app.route('/api/entries')
+def query_entries():
     today = date.today()
+    try:
+        start_date = parse_date_arg('start', today)
+        end_date = parse_date_arg('end', start_date)
+        line_numbers = parse_lines_arg()
+        reasons = [reason for reason in request.args.getlist('reason') if reason]
+        limit = min(int(request.args.get('limit', ENTRY_PAGE_SIZE)), ENTRY_PAGE_MAX)
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+        if limit < 1:
+            raise ValueError('limit must be positive')
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameters: {str(e)}'}), 400
     
-    if report_type == 'daily':
-        start_date = end_date = today
-    else:  # weekly
-        start_date = today - timedelta(days=today.weekday())
-        end_date = today
-    
-    report_data = generate_report_data(start_date, end_date)
-    
-    # Create PDF
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    elements = []
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30
+    # An entry starts on its shift date or, after midnight, the day after. The redundant
+    # start_at bounds let the database walk (start_at, id) in order instead of sorting the
+    # whole date range for every page.
+    query = ProductionEntry.query.options(selectinload(ProductionEntry.losses)).filter(
+        shift_date_in_days(start_date, end_date),
+        ProductionEntry.start_at >= datetime.combine(start_date, time()),
+        ProductionEntry.start_at < datetime.combine(end_date + timedelta(days=2), time())
     )
-    title = f"Production Report ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})"
-    elements.append(Paragraph(title, title_style))
-    
-    # Styles for the report
-    heading2_style = ParagraphStyle(
-        'Heading2',
-        parent=styles['Heading2'],
-        fontSize=14,
-        spaceAfter=12
+    if line_numbers:
+        query = query.filter(ProductionEntry.line_number.in_(line_numbers))
+    if reasons:
+        query = query.filter(ProductionEntry.losses.any(LossEntry.reason.in_(reasons)))
+    if after:
+        after_start_at, after_id = after
+        query = query.filter(ProductionEntry.start_at >= after_start_at, db.or_(
+            ProductionEntry.start_at > after_start_at,
+            db.and_(ProductionEntry.start_at == after_start_at, ProductionEntry.id > after_id)
+        ))
+    
+    # Fetch one extra row to know whether another page exists
+    entries = query.order_by(ProductionEntry.start_at, ProductionEntry.id).limit(limit + 1).all()
+    
+    # Entries of archived months are read from their files (whose records have the same
+    # shape as serialize_entry()) and merged in on (start_at, id)
+    archived = (
+        record for record in archived_records(start_date, end_date, line_numbers)
+        if (not reasons or any(loss['reason'] in reasons for loss in record['losses']))
+        and (after is None or (datetime.fromisoformat(record['start_at']), record['id']) > after)
     )
+    rows = list(itertools.islice(heapq.merge(
+        archived,
+        (dict(serialize_entry(entry), timestamp=entry.timestamp.isoformat()) for entry in entries),
+        key=lambda row: (row['start_at'], row['id'])
+    ), limit + 1))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     
-    # Process each line
-    for line_number in [1, 2]:
-        elements.append(Paragraph(f"Line {line_number}", heading2_style))
-        line_data = report_data[line_number]
-        
-        for entry_date in sorted(line_data.keys()):
-            daily_data = line_data[entry_date]
-            
-            # Daily summary table
-            data = [
-                ['Date', 'Planned', 'Actual', 'Total Loss Time'],
-                [
-                    entry_date.strftime('%Y-%m-%d'),
-                    str(daily_data['planned']),
-                    str(daily_data['actual']),
-                    f"{daily_data['total_loss_time']} min"
-                ]
-            ]
-            
-            t = Table(data, colWidths=[100, 100, 100, 100])
-            t.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 10),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            elements.append(t)
-            elements.append(Spacer(1, 20))
-            
-            # Loss details table
-            if daily_data['losses']:
-                elements.append(Paragraph("Loss Details:", heading2_style))
-                
-                # Create loss details table
-                loss_table_data = [['Loss Reason', 'Time Range', 'Duration', 'Remarks']]
-                
-                for reason, loss_data in daily_data['losses'].items():
-                    for occurrence in loss_data['occurrences']:
-                        loss_table_data.append([
-                            reason,
-                            occurrence['time_range'],
-                            f"{occurrence['loss_time']} min",
-                            occurrence['remarks'] or ''
-                        ])
-                    
-                    # Add a summary row for this reason
-                    loss_table_data.append([
-                        f"Total for {reason}",
-                        '',
-                        f"{loss_data['total_time']} min",
-                        ''
-                    ])
-                
-                # Create the table with specific column widths
-                loss_table = Table(loss_table_data, colWidths=[150, 100, 80, 170])
-                
-                # Style the table
-                table_style = [
-                    # Header row styling
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 9),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                    
-                    # Content styling
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-                    ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 8),
-                    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                    
-                    # Align durations to center
-                    ('ALIGN', (2, 0), (2, -1), 'CENTER'),
-                ]
-                
-                # Add alternating row colors and total row styling
-                for i in range(len(loss_table_data)):
-                    if i > 0:  # Skip header row
-                        if 'Total for' in loss_table_data[i][0]:
-                            # Style for total rows
-                            table_style.extend([
-                                ('BACKGROUND', (0, i), (-1, i), colors.lightgrey),
-                                ('FONTNAME', (0, i), (-1, i), 'Helvetica-Bold'),
-                                ('LINEABOVE', (0, i), (-1, i), 1, colors.grey),
-                                ('LINEBELOW', (0, i), (-1, i), 1, colors.grey),
-                            ])
-                        elif i % 2 == 1:  # Alternating row colors
-                            table_style.append(('BACKGROUND', (0, i), (-1, i), colors.whitesmoke))
-                
-                loss_table.setStyle(TableStyle(table_style))
-                elements.append(loss_table)
-                elements.append(Spacer(1, 20))
-            
-            elements.append(Spacer(1, 20))
-        
-        elements.append(Spacer(1, 30))
+    return jsonify({
+        'entries': rows,
+        'next_cursor': encode_cursor(rows[-1]) if has_more else None
+    })
+
+# Production analytics
+@app.route('/api/analytics')
+def get_analytics():
+    # Imported here so the NumPy import cost is only paid by analytics requests
+    import analytics
+    
+    today = date.today()
+    try:
+        start_date = parse_date_arg('start', today)
+        end_date = parse_date_arg('end', start_date)
+        line_numbers = parse_lines_arg()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid analytics parameters: {str(e)}'}), 400
+    
+    entry_filter = shift_date_in_days(start_date, end_date)
+    if line_numbers:
+        entry_filter = db.and_(entry_filter, ProductionEntry.line_number.in_(line_numbers))
+    
+    # Columns are fetched in two flat queries and aggregated with NumPy group-bys
+    entry_rows = db.session.execute(select(
+        ProductionEntry.line_number,
+        ProductionEntry.from_time,
+        ProductionEntry.to_time,
+        ProductionEntry.planned,
+        ProductionEntry.actual,
+        ProductionEntry.total_loss_time
+    ).where(entry_filter)).all()
+    loss_rows = db.session.execute(select(
+        LossEntry.reason,
+        LossEntry.loss_time
+    ).join(ProductionEntry, LossEntry.production_entry_id == ProductionEntry.id).where(entry_filter)).all()
+    
+    # Archived months are read back from their files
+    for record in archived_records(start_date, end_date, line_numbers):
+        entry_rows.append((
+            record['line_number'],
+            parse_hhmm(record['from_time']),
+            parse_hhmm(record['to_time']),
+            record['planned'],
+            record['actual'],
+            record['total_loss_time']
+        ))
+        loss_rows.extend((loss['reason'], loss['loss_time']) for loss in record['losses'])
+    
+    columns = analytics.entry_columns(entry_rows)
+    nominal_rates = {
+        number: rate for number, rate in db.session.query(Line.number, Line.nominal_rate) if rate
+    }
     
-    # Build PDF
-    doc.build(elements)
-    buffer.seek(0)
+    return jsonify({
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'lines': analytics.line_summary(
+            columns['line_number'], columns['planned'], columns['actual'], columns['total_loss_time'],
+            columns['from_minutes'], columns['to_minutes'], nominal_rates
+        ),
+        'loss_pareto': analytics.loss_pareto(
+            [reason for reason, _ in loss_rows], [loss_time for _, loss_time in loss_rows]
+        ),
+        'hourly_heatmap': analytics.hourly_heatmap(
+            columns['line_number'], columns['from_minutes'], columns['planned'], columns['actual'],
+            columns['total_loss_time']
+        )
+    })
+
+# Streaming export
+EXPORT_COLUMNS = [
+    'entry_id', 'timestamp', 'line_number', 'shift', 'shift_date', 'start_at', 'end_at', 'from_time',
+    'to_time', 'planned', 'actual', 'total_loss_time', 'loss_reason', 'loss_time', 'loss_remarks'
+]
+
+def parse_date_arg(name, default):
+    value = request.args.get(name)
+    if not value:
+        return default
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def parse_line_values(values):
+    # Accepts ?line=1&line=2 as well as ?line=1,2
+    return [int(line) for value in values for line in value.split(',') if line]
+
+def parse_lines_arg():
+    return parse_line_values(request.args.getlist('line'))
+
+def export_rows(start_date, end_date, line_numbers):
+    """Yield one flat row per loss (or per entry without losses), in production order.
+    
+    Rows still in the database and rows of archived months are merged on (start_at, id).
+    """
+    return heapq.merge(
+        archived_export_rows(start_date, end_date, line_numbers),
+        database_export_rows(start_date, end_date, line_numbers),
+        key=lambda row: (row[5], row[0])
+    )
+
+def archived_export_rows(start_date, end_date, line_numbers):
+    columns = ('id', 'timestamp', 'line_number', 'shift', 'shift_date', 'start_at', 'end_at', 'from_time',
+               'to_time', 'planned', 'actual', 'total_loss_time')
+    for record in archived_records(start_date, end_date, line_numbers):
+        entry_row = tuple(record[column] for column in columns)
+        if not record['losses']:
+            yield entry_row + (None, None, None)
+        for loss in record['losses']:
+            yield entry_row + (loss['reason'], loss['loss_time'], loss['remarks'])
+
+def database_export_rows(start_date, end_date, line_numbers):
+    """Yield export rows for entries still in the database from a server-side cursor."""
+    stmt = select(
+        ProductionEntry.id,
+        ProductionEntry.timestamp,
+        ProductionEntry.line_number,
+        ProductionEntry.shift,
+        ProductionEntry.shift_date,
+        ProductionEntry.start_at,
+        ProductionEntry.end_at,
+        ProductionEntry.from_time,
+        ProductionEntry.to_time,
+        ProductionEntry.planned,
+        ProductionEntry.actual,
+        ProductionEntry.total_loss_time,
+        LossEntry.reason,
+        LossEntry.loss_time,
+        LossEntry.remarks
+    ).outerjoin(
+        LossEntry, LossEntry.production_entry_id == ProductionEntry.id
+    ).where(
+        shift_date_in_days(start_date, end_date)
+    ).order_by(ProductionEntry.start_at, ProductionEntry.id, LossEntry.id)
+    
+    if line_numbers:
+        stmt = stmt.where(ProductionEntry.line_number.in_(line_numbers))
+    
+    result = db.session.execute(stmt.execution_options(yield_per=app.config['EXPORT_BATCH_SIZE']))
+    try:
+        for row in result:
+            yield (
+                row[0],
+                row[1].isoformat(),
+                row[2],
+                row[3],
+                row[4].isoformat(),
+                row[5].isoformat(),
+                row[6].isoformat(),
+                row[7].strftime('%H:%M'),
+                row[8].strftime('%H:%M'),
+                row[9],
+                row[10],
+                row[11],
+                row[12],
+                row[13],
+                row[14]
+            )
+    finally:
+        result.close()
+
+def generate_csv_export(rows):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
     
-    return send_file(
-        buffer,
-        download_name=f'production_report_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}.pdf',
-        mimetype='application/pdf'
+    batch_size = app.config['EXPORT_BATCH_SIZE']
+    pending = 0
+    for row in rows:
+        if pending == 0:
+            buffer.seek(0)
+            buffer.truncate()
+        writer.writerow(row)
+        pending += 1
+        if pending == batch_size:
+            yield buffer.getvalue()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+def generate_ndjson_export(rows):
+    batch_size = app.config['EXPORT_BATCH_SIZE']
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(dict(zip(EXPORT_COLUMNS, row))))
+        if len(chunk) == batch_size:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+@app.route('/api/export')
+def export_entries():
+    today = date.today()
+    try:
+        start_date = parse_date_arg('start', today)
+        end_date = parse_date_arg('end', start_date)
+        line_numbers = parse_lines_arg()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid export parameters: {str(e)}'}), 400
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format == 'csv':
+        body = generate_csv_export(export_rows(start_date, end_date, line_numbers))
+        mimetype = 'text/csv'
+    elif export_format == 'ndjson':
+        body = generate_ndjson_export(export_rows(start_date, end_date, line_numbers))
+        mimetype = 'application/x-ndjson'
+    else:
+        return jsonify({'error': f'Unsupported export format: {export_format}'}), 400
+    
+    filename = f'production_export_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}.{export_format}'
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
 
 # Health check endpoint
@@ -508,24 +2394,221 @@ def internal_error(error):
     db.session.rollback()
     return jsonify({'error': 'Internal server error'}), 500
 
-# Request logging middleware
+# Raised when the database can't be reached even after the pool's pre-ping reconnect
+@app.errorhandler(OperationalError)
+def database_unavailable(error):
+    app.logger.error(f"Database connection error: {str(error)}")
+    db.session.rollback()
+    return jsonify({
+        'status': 'error',
+        'message': 'Database connection error',
+        'timestamp': datetime.now().isoformat()
+    }), 503
+
+# Instrumentation
+metrics_registry = metrics.Registry()
+REQUEST_LATENCY = metrics_registry.histogram(
+    'planvsactual_request_duration_seconds', 'Request latency by route', ('method', 'route'))
+REQUEST_COUNT = metrics_registry.counter(
+    'planvsactual_requests_total', 'Requests by route and status', ('method', 'route', 'status'))
+RESPONSE_SIZE = metrics_registry.histogram(
+    'planvsactual_response_size_bytes', 'Response body size by route', ('route',), buckets=metrics.SIZE_BUCKETS)
+REQUEST_SQL_QUERIES = metrics_registry.histogram(
+    'planvsactual_request_sql_queries', 'SQL statements issued per request', ('route',), buckets=metrics.COUNT_BUCKETS)
+REQUEST_SQL_TIME = metrics_registry.histogram(
+    'planvsactual_request_sql_duration_seconds', 'Total SQL time per request', ('route',))
+SQL_QUERY_TIME = metrics_registry.histogram(
+    'planvsactual_sql_query_duration_seconds', 'Duration of individual SQL statements')
+POOL_CHECKOUT_TIME = metrics_registry.histogram(
+    'planvsactual_db_pool_checkout_seconds', 'Time spent waiting for a pooled database connection')
+PDF_RENDER_TIME = metrics_registry.histogram(
+    'planvsactual_pdf_render_seconds', 'Time spent rendering PDF reports')
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
 @app.before_request
-def log_request_info():
-    if not request.path == '/health':  # Skip logging health checks
-        app.logger.info(f"Request: {request.method} {request.path} from {request.remote_addr}")
+def start_request_metrics():
+    g.request_started = time_module.perf_counter()  # The request log's duration uses it too
+    if not app.config['METRICS_ENABLED']:
+        return
+    g.sql_queries = 0
+    g.sql_time = 0.0
+    g.sql_statements = [] if app.config['SLOW_REQUEST_MS'] else None
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is None or not app.config['METRICS_ENABLED']:
+        return response
+    elapsed = time_module.perf_counter() - started
+    route = _route_label()
+    
+    REQUEST_LATENCY.observe(elapsed, request.method, route)
+    REQUEST_COUNT.inc(request.method, route, str(response.status_code))
+    REQUEST_SQL_QUERIES.observe(g.sql_queries, route)
+    REQUEST_SQL_TIME.observe(g.sql_time, route)
+    if response.content_length is not None:
+        RESPONSE_SIZE.observe(response.content_length, route)
+    
+    slow_request_ms = app.config['SLOW_REQUEST_MS']
+    if slow_request_ms and elapsed * 1000 >= slow_request_ms:
+        statements = '\n'.join(
+            f"  [{duration * 1000:.1f} ms] {statement}" for duration, statement in g.sql_statements
+        )
+        app.logger.warning(
+            f"Slow request: {request.method} {request.path} took {elapsed * 1000:.1f} ms "
+            f"with {g.sql_queries} SQL statements ({g.sql_time * 1000:.1f} ms)\n{statements}"
+        )
+    return response
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time_module.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time_module.perf_counter() - conn.info['query_started'].pop()
+    SQL_QUERY_TIME.observe(elapsed)
+    if has_request_context() and 'sql_queries' in g:
+        g.sql_queries += 1
+        g.sql_time += elapsed
+        if g.sql_statements is not None:
+            g.sql_statements.append((elapsed, statement))
+
+def install_instrumentation(engine):
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    
+    # Every Connection gets its DBAPI connection through Engine.raw_connection(), so timing
+    # it measures pool checkout (including pre-ping and any wait for a free connection)
+    raw_connection = engine.raw_connection
+    
+    def timed_raw_connection():
+        started = time_module.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            POOL_CHECKOUT_TIME.observe(time_module.perf_counter() - started)
+    
+    engine.raw_connection = timed_raw_connection
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+# Request logging middleware
+UNLOGGED_PATHS = {'/health', '/metrics'}  # Skip logging health checks and metrics scrapes
 
 @app.after_request
-def log_response_info(response):
-    if not request.path == '/health':  # Skip logging health checks
-        app.logger.info(f"Response: {response.status} to {request.method} {request.path}")
+def log_request(response):
+    if request.path not in UNLOGGED_PATHS:
+        started = g.get('request_started')
+        duration_ms = round((time_module.perf_counter() - started) * 1000, 1) if started else None
+        # Successful requests are sampled; errors are always logged
+        app.logger.info(
+            f"{request.method} {request.path} {response.status_code}",
+            extra={
+                'sampled': response.status_code < 400,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': duration_ms,
+                'remote_addr': request.remote_addr
+            }
+        )
     return response
 
-# Initialize database on startup
-if init_db():
-    app.logger.info("Application started successfully with database connection")
-else:
-    app.logger.error("Application started but database initialization failed")
+# Command line maintenance
+@app.cli.command('init-db')
+def init_db_command():
+    """Create missing tables, columns and indexes and seed the production lines."""
+    if not init_db():
+        raise SystemExit("Database initialization failed")
+    click.echo("Database initialized")
+
+@app.cli.command('rebuild-summaries')
+def rebuild_summaries_command():
+    """Backfill the daily summary rollup from the raw entries."""
+    count = rebuild_daily_summaries()
+    click.echo(f"Rebuilt {count} daily line summaries")
+
+@app.cli.command('check-summaries')
+def check_summaries_command():
+    """Compare the daily summary rollup against a full recompute."""
+    mismatches = check_daily_summaries()
+    for mismatch in mismatches:
+        click.echo(f"{mismatch['key']}: expected {mismatch['expected']}, rollup has {mismatch['rollup']}")
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} rollup mismatches found")
+    click.echo("Daily summaries are consistent")
+
+@app.cli.command('archive-entries')
+@click.option('--older-than', 'older_than_days', type=int,
+              help='Archive months that ended more than this many days ago (default: ARCHIVE_AFTER_DAYS).')
+@click.option('--vacuum', is_flag=True, help='VACUUM the entry tables afterwards to reclaim the space.')
+def archive_entries_command(older_than_days, vacuum):
+    """Move old entries into monthly archive files, keeping their daily totals."""
+    try:
+        moved = archive_entries(older_than_days)
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    for month, count in moved.items():
+        click.echo(f"{month:%Y-%m}: archived {count} entries")
+    if vacuum and moved:
+        vacuum_entry_tables()
+    click.echo(f"Archived {sum(moved.values())} entries")
+
+@app.cli.command('find-overlaps')
+@click.option('--line', 'line_number', type=int, help='Only check this line.')
+def find_overlaps_command(line_number):
+    """Report entries whose intervals overlap another entry on the same line."""
+    stmt = select(
+        ProductionEntry.line_number, ProductionEntry.start_at, ProductionEntry.end_at, ProductionEntry.id
+    ).order_by(ProductionEntry.line_number, ProductionEntry.start_at, ProductionEntry.end_at)
+    if line_number is not None:
+        stmt = stmt.where(ProductionEntry.line_number == line_number)
+    
+    # Rows arrive sorted per line, so each line is checked in one streaming sweep
+    rows = db.session.execute(stmt.execution_options(yield_per=app.config['EXPORT_BATCH_SIZE']))
+    count = 0
+    for line, line_rows in itertools.groupby(rows, key=lambda row: row[0]):
+        intervals = ((start_at, end_at, (entry_id, start_at, end_at)) for _, start_at, end_at, entry_id in line_rows)
+        for entry, other in sweep_overlaps(intervals):
+            click.echo(
+                f"Line {line}: entry {entry[0]} ({entry[1]:%Y-%m-%d %H:%M}-{entry[2]:%H:%M}) overlaps "
+                f"entry {other[0]} ({other[1]:%Y-%m-%d %H:%M}-{other[2]:%H:%M})"
+            )
+            count += 1
+    if count:
+        raise SystemExit(f"{count} overlapping entries found")
+    click.echo("No overlapping entries found")
+
+# Application factory
+#
+# Importing this module only defines the app. create_app() does the per-process setup
+# (log writer thread, SQL instrumentation) and is what gunicorn serves. Schema bootstrap
+# is not part of startup: it runs once per deploy through `flask init-db`.
+def create_app():
+    if app.extensions.get('planvsactual_started'):
+        return app
+    app.extensions['planvsactual_started'] = True
+    
+    configure_app_logging()
+    app.logger.info('PlanVsActual startup')
+    app.logger.info(f"Database URL configured as: {safe_db_url}")
+    
+    with app.app_context():
+        engine = db.engine
+    if app.config['METRICS_ENABLED']:
+        install_instrumentation(engine)
+    
+    # With gunicorn --preload this runs in the master before the workers fork. Nothing
+    # connects here, but make sure a worker never reuses a connection inherited from it
+    os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+    return app
 
 if __name__ == '__main__':
+    create_app()
+    if not init_db():
+        app.logger.error("Database initialization failed")
     port = int(os.getenv('PORT', 5010))
     app.run(host='0.0.0.0', port=port)
@@ -0,0 +1,272 @@
+"""Optional ASGI entry point.
+
+    uvicorn asgi:application --workers 2
+
+Endpoints that spend most of their time waiting run on the event loop: the daily report
+(through an async SQLAlchemy engine), the live dashboard feed and synchronous PDF reports.
+Every other route is passed to the Flask app, which runs on a thread pool. Needs the
+packages in requirements-asgi.txt.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from datetime import date
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.http import parse_etags, quote_etag
+
+from app import (
+    REQUEST_COUNT, REQUEST_LATENCY, app, create_app, daily_entries_select, daily_feed, daily_report_cache,
+    daily_report_versions, db, format_daily_report_etag, format_sse, parse_line_values, parse_report_params,
+    report_cache_key, report_cache_path, report_download_name, serialize_entry, submit_report_job
+)
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+def async_database_url(url):
+    scheme, rest = url.split(':', 1)
+    driver = ASYNC_DRIVERS.get(scheme.split('+')[0])
+    if driver is None:
+        raise RuntimeError(f"No async driver for database URL scheme: {scheme}")
+    return f"{driver}:{rest}"
+
+def _header(scope, name):
+    for key, value in scope['headers']:
+        if key.decode('latin-1').lower() == name:
+            return value.decode('latin-1')
+    return None
+
+async def send_response(send, status, body=b'', headers=()):
+    headers = list(headers) + [('Content-Length', str(len(body)))]
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(key.encode('latin-1'), value.encode('latin-1')) for key, value in headers]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+    return status
+
+async def send_json(send, status, payload):
+    return await send_response(send, status, app.json.dumps(payload).encode(), [('Content-Type', 'application/json')])
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+class FeedBridge:
+    """Relays this process's DailyFeed to any number of asyncio clients.
+
+    The bridge holds one DailyFeed subscription read by one thread, so each connected
+    dashboard only costs an asyncio.Queue rather than a thread.
+    """
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, day, versions):
+        client = asyncio.Queue(maxsize=app.config['STREAM_QUEUE_SIZE'])
+        with self._lock:
+            self._clients.add(client)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._relay, args=(day, versions), name='feed-bridge', daemon=True)
+                self._thread.start()
+        return client
+
+    def remove(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def _relay(self, day, versions):
+        subscriber = daily_feed.subscribe(day, versions)
+        try:
+            while True:
+                with self._lock:
+                    if not self._clients:
+                        self._thread = None
+                        return
+                try:
+                    message = subscriber.get(timeout=1)
+                except queue.Empty:
+                    continue
+                self._loop.call_soon_threadsafe(self._fan_out, message)
+        finally:
+            daily_feed.unsubscribe(subscriber)
+
+    def _fan_out(self, message):
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.put_nowait(message)
+            except asyncio.QueueFull:
+                # A stalled client is dropped; its EventSource reconnects for a fresh snapshot
+                self.remove(client)
+                while not client.empty():
+                    client.get_nowait()
+                client.put_nowait(None)
+
+class Application:
+    def __init__(self, flask_app):
+        flask_app.config['LIVE_FEED_NATIVE'] = True  # Streams don't hold a thread here
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config['ASGI_WSGI_THREADS'])
+        # Use the URL the sync engine actually connects to: Flask-SQLAlchemy moves relative
+        # SQLite paths into the instance folder
+        with flask_app.app_context():
+            database_url = db.engine.url.render_as_string(hide_password=False)
+        self.engine = create_async_engine(
+            async_database_url(database_url),
+            **flask_app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        )
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.feed = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            path = scope['path']
+            report_type = path[len('/api/report/'):] if path.startswith('/api/report/') else None
+            if path == '/api/daily-report':
+                return await self.observe('/api/daily-report', self.daily_report(scope, send))
+            if path == '/api/stream/daily':
+                return await self.observe('/api/stream/daily', self.stream_daily(scope, receive, send))
+            if report_type and '/' not in report_type:
+                return await self.observe('/api/report/<report_type>', self.report(scope, send, report_type))
+
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def observe(self, route, handler):
+        started = time.perf_counter()
+        status = await handler
+        REQUEST_LATENCY.observe(time.perf_counter() - started, 'GET', route)
+        REQUEST_COUNT.inc('GET', route, str(status))
+
+    async def load_daily_entries(self, session, day, line_numbers=None):
+        entries = (await session.scalars(daily_entries_select(day, line_numbers))).all()
+        return [serialize_entry(entry) for entry in entries]
+
+    async def daily_report(self, scope, send):
+        query = parse_qs(scope['query_string'].decode())
+        try:
+            line_numbers = tuple(sorted(set(parse_line_values(query.get('line', [])))))
+        except ValueError as e:
+            return await send_json(send, 400, {'error': f'Invalid line filter: {str(e)}'})
+
+        # Same ETag, cache and body as the Flask route, so clients can use either
+        today = date.today()
+        async with self.sessions() as session:
+            versions = (await session.execute(daily_report_versions(today, line_numbers))).all()
+            etag = format_daily_report_etag(today, line_numbers, versions)
+            headers = [('ETag', quote_etag(etag)), ('Cache-Control', 'no-cache')]
+            if parse_etags(_header(scope, 'if-none-match')).contains(etag):
+                return await send_response(send, 304, headers=headers)
+
+            key = (today, line_numbers)
+            cached = daily_report_cache.get(key)
+            if cached is not None and cached[0] == etag:
+                body = cached[1]
+            else:
+                body = app.json.dumps(await self.load_daily_entries(session, today, line_numbers))
+                daily_report_cache.set(key, (etag, body))
+        return await send_response(send, 200, body.encode(), headers + [('Content-Type', 'application/json')])
+
+    async def stream_daily(self, scope, receive, send):
+        today = date.today()
+        async with self.sessions() as session:
+            versions = dict((await session.execute(daily_report_versions(today, ()))).all())
+            snapshot = format_sse('snapshot', {
+                'date': today.isoformat(),
+                'entries': await self.load_daily_entries(session, today)
+            })
+
+        if self.feed is None:
+            self.feed = FeedBridge(asyncio.get_running_loop())
+        client = self.feed.add(today, versions)
+        keepalive = app.config['STREAM_KEEPALIVE_SECONDS']
+
+        async def relay():
+            await send({'type': 'http.response.body', 'body': f"retry: 3000\n{snapshot}".encode(), 'more_body': True})
+            while True:
+                try:
+                    message = await asyncio.wait_for(client.get(), keepalive)
+                except asyncio.TimeoutError:
+                    message = ': keepalive\n\n'
+                if message is None:
+                    break
+                await send({'type': 'http.response.body', 'body': message.encode(), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]})
+        tasks = [asyncio.ensure_future(relay()), asyncio.ensure_future(wait_for_disconnect(receive))]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.feed.remove(client)
+        return 200
+
+    def _prepare_report(self, report_type, params):
+        # The cache key needs a short rollup query, run on a thread with the sync session
+        with app.app_context():
+            start_date, end_date, line_numbers = parse_report_params(report_type, params)
+            key = report_cache_key(start_date, end_date, line_numbers)
+            future = None
+            if not os.path.exists(report_cache_path(key)):
+                future = submit_report_job(start_date, end_date, line_numbers, key)
+            return key, report_download_name(start_date, end_date, line_numbers), future
+
+    async def report(self, scope, send, report_type):
+        query = parse_qs(scope['query_string'].decode())
+        try:
+            key, download_name, future = await asyncio.to_thread(self._prepare_report, report_type, {
+                'start': query.get('start', [None])[0],
+                'end': query.get('end', [None])[0],
+                'lines': parse_line_values(query.get('line', []))
+            })
+        except ValueError as e:
+            return await send_json(send, 400, {'error': f'Invalid report parameters: {str(e)}'})
+
+        # Rendering happens on the report workers; waiting for it holds no thread here
+        if future is not None:
+            try:
+                await asyncio.wrap_future(future)
+            except Exception as e:
+                return await send_json(send, 500, {'error': f'Report generation failed: {str(e)}'})
+
+        try:
+            pdf = await asyncio.to_thread(_read_file, report_cache_path(key))
+        except FileNotFoundError:
+            return await send_json(send, 409, {'error': 'Report data changed while rendering, request it again'})
+        return await send_response(send, 200, pdf, [
+            ('Content-Type', 'application/pdf'),
+            ('Content-Disposition', f'inline; filename="{download_name}"')
+        ])
+
+def _read_file(path):
+    with open(path, 'rb') as pdf_file:
+        return pdf_file.read()
+
+application = Application(create_app())
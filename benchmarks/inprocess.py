@@ -0,0 +1,252 @@
+"""Benchmarks that run inside a single app process, one scenario per invocation.
+
+run.py starts this script in a fresh interpreter for every scenario, with the scenario's
+environment (DATABASE_URL, logging settings, ...) already set, because app.py reads its
+configuration when it is imported. Results are written as JSON to --output.
+
+    load       the endpoint mix through the Flask test client
+    startup    time to import app.py and run create_app()
+    archive    hot table size and query latency before and after `flask archive-entries`
+    export     stream every seeded entry through /api/export as CSV and NDJSON
+    reports    report data, PDF render time and memory for ranges ending on the last seeded day
+    analytics  /api/analytics over the whole seeded range and its last 30 days
+    ingest     rows/sec through POST /api/entry one row at a time vs /api/entries/bulk
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from load import (
+    ENDPOINTS, ClientTarget, current_rss_mb, entry_payload, peak_rss_mb, run_endpoints, run_load, time_calls
+)
+
+BULK_BATCH_ROWS = 500  # Rows per /api/entries/bulk request in the ingest mode
+
+def seeded_days(planvsactual):
+    db = planvsactual.db
+    first_day, last_day = db.session.query(
+        db.func.min(planvsactual.ProductionEntry.shift_date), db.func.max(planvsactual.ProductionEntry.shift_date)
+    ).one()
+    return planvsactual._as_date(first_day), planvsactual._as_date(last_day)
+
+def run_load_mode(args):
+    import app as planvsactual
+    flask_app = planvsactual.create_app()
+    return {
+        'endpoints': run_endpoints(ClientTarget(flask_app), args.requests, args.concurrency, args.write_offset),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def run_startup_mode(args):
+    started = time.perf_counter()
+    import app as planvsactual
+    imported = time.perf_counter()
+    planvsactual.create_app()
+    created = time.perf_counter()
+    return {
+        'import_ms': round((imported - started) * 1000, 3),
+        'create_app_ms': round((created - imported) * 1000, 3),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def hot_tables(planvsactual):
+    tables = {
+        'production_entry_rows': planvsactual.ProductionEntry.query.count(),
+        'loss_entry_rows': planvsactual.LossEntry.query.count()
+    }
+    database_url = planvsactual.app.config['SQLALCHEMY_DATABASE_URI']
+    if database_url.startswith('sqlite:///'):
+        tables['database_mb'] = round(os.path.getsize(database_url[len('sqlite:///'):]) / (1024 * 1024), 2)
+    return tables
+
+def measure_queries(planvsactual, target, requests, first_day):
+    today = date.today()
+    archived_end = first_day + timedelta(days=6)
+
+    def get(path):
+        return lambda index: ('GET', path, None)
+
+    queries = {
+        'entries_week': get(f'/api/entries?start={today - timedelta(days=6)}&end={today}&limit=100'),
+        'analytics_month': get(f'/api/analytics?start={today - timedelta(days=29)}&end={today}'),
+        'export_month': get(f'/api/export?start={today - timedelta(days=29)}&end={today}&format=ndjson'),
+        'export_oldest_week': get(f'/api/export?start={first_day}&end={archived_end}&format=ndjson')
+    }
+    results = {name: run_load(target, make_request, requests, 1) for name, make_request in queries.items()}
+
+    # The report data functions directly, without the PDF cache in front of them
+    results['report_data_week'] = time_calls(
+        lambda: planvsactual.generate_report_data(today - timedelta(days=6), today), requests
+    )
+    results['report_data_oldest_week'] = time_calls(
+        lambda: planvsactual.generate_report_data(first_day, archived_end), requests
+    )
+    results['check_summaries'] = time_calls(planvsactual.check_daily_summaries, max(1, requests // 20))
+    return results
+
+def run_archive_mode(args):
+    import app as planvsactual
+    flask_app = planvsactual.create_app()
+    target = ClientTarget(flask_app)
+
+    with flask_app.app_context():
+        db = planvsactual.db
+        first_day = planvsactual._as_date(db.session.query(db.func.min(planvsactual.ProductionEntry.shift_date)).scalar())
+        result = {'hot_tables_before': hot_tables(planvsactual)}
+        result['before'] = measure_queries(planvsactual, target, args.requests, first_day)
+
+        started = time.perf_counter()
+        moved = planvsactual.archive_entries(args.archive_after_days)
+        planvsactual.vacuum_entry_tables()
+        result['archive_seconds'] = round(time.perf_counter() - started, 3)
+        result['archived_entries'] = sum(moved.values())
+
+        result['hot_tables_after'] = hot_tables(planvsactual)
+        result['after'] = measure_queries(planvsactual, target, args.requests, first_day)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+def run_export_mode(args):
+    import app as planvsactual
+    flask_app = planvsactual.create_app()
+    client = flask_app.test_client()
+
+    with flask_app.app_context():
+        first_day, last_day = seeded_days(planvsactual)
+    client.get('/health')  # Connect before the baseline is taken
+
+    # The export must not grow with the range, so peak RSS is compared against this
+    result = {'rss_before_mb': current_rss_mb()}
+    for export_format in ('csv', 'ndjson'):
+        started = time.perf_counter()
+        response = client.get(
+            f'/api/export?start={first_day}&end={last_day}&format={export_format}',
+            buffered=False
+        )
+        first_byte = None
+        lines = 0
+        size = 0
+        for chunk in response.response:
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            lines += chunk.count(b'\n')
+            size += len(chunk)
+        response.close()
+        elapsed = time.perf_counter() - started
+        rows = lines - 1 if export_format == 'csv' else lines  # Not the CSV header
+        result[export_format] = {
+            'rows': rows,
+            'mb': round(size / (1024 * 1024), 1),
+            'seconds': round(elapsed, 3),
+            'throughput': round(rows / elapsed, 1),
+            'first_byte_ms': round(first_byte * 1000, 3) if first_byte is not None else None
+        }
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+def run_reports_mode(args):
+    import app as planvsactual
+    flask_app = planvsactual.create_app()
+    result = {'ranges': {}}
+
+    with flask_app.app_context():
+        result['entries'] = planvsactual.ProductionEntry.query.count()
+        _, last_day = seeded_days(planvsactual)
+        names = planvsactual.line_names()
+        for days in args.ranges:
+            start_date = last_day - timedelta(days=days - 1)
+            report_data = planvsactual.generate_report_data(start_date, last_day)
+
+            def render():
+                planvsactual.render_pdf(report_data, start_date, last_day, names)
+
+            # One traced render for the allocation peak (it also pays for importing ReportLab),
+            # then untraced ones for the time
+            tracemalloc.start()
+            render()
+            render_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            result['ranges'][f'{days}d'] = {
+                'report_data': time_calls(lambda: planvsactual.generate_report_data(start_date, last_day), args.requests),
+                'render': time_calls(render, args.render_repeat),
+                'render_peak_mb': round(render_peak / (1024 * 1024), 1)
+            }
+        result['daily_entries'] = time_calls(lambda: planvsactual.daily_entries(last_day), args.requests)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+def run_analytics_mode(args):
+    import app as planvsactual
+    flask_app = planvsactual.create_app()
+    target = ClientTarget(flask_app)
+    with flask_app.app_context():
+        first_day, last_day = seeded_days(planvsactual)
+
+    result = {}
+    ranges = {'all': first_day, 'last_30_days': last_day - timedelta(days=29)}
+    for name, start_date in ranges.items():
+        request = ('GET', f'/api/analytics?start={start_date}&end={last_day}', None)
+        cold = run_load(target, lambda index: request, 1, 1)  # The first one also imports NumPy
+        result[name] = run_load(target, lambda index: request, args.requests, 1)
+        result[name]['cold_ms'] = cold['p50_ms']
+        result[name]['errors'] += cold['errors']
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+def run_ingest_mode(args):
+    # One client for both, so the comparison is per round trip and commit, not concurrency
+    import app as planvsactual
+    target = ClientTarget(planvsactual.create_app())
+    today = date.today()
+
+    single = run_load(target, lambda index: ENDPOINTS['add_entry'](args.write_offset + index, today), args.requests, 1)
+    single['rows_per_sec'] = single['throughput']
+
+    first_bulk_index = args.write_offset + args.requests
+
+    def bulk_request(index):
+        first = first_bulk_index + index * BULK_BATCH_ROWS
+        return ('POST', '/api/entries/bulk', [entry_payload(first + offset, today) for offset in range(BULK_BATCH_ROWS)])
+
+    bulk = run_load(target, bulk_request, max(1, args.requests // 10), 1)
+    bulk['rows_per_sec'] = round(bulk['throughput'] * BULK_BATCH_ROWS, 1)
+    return {'single': single, 'bulk': bulk, 'bulk_batch_rows': BULK_BATCH_ROWS, 'peak_rss_mb': peak_rss_mb()}
+
+def parse_ranges(value):
+    return [int(days) for days in value.split(',') if days]
+
+MODES = {
+    'load': run_load_mode,
+    'startup': run_startup_mode,
+    'archive': run_archive_mode,
+    'export': run_export_mode,
+    'reports': run_reports_mode,
+    'analytics': run_analytics_mode,
+    'ingest': run_ingest_mode
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=sorted(MODES))
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--write-offset', type=int, default=0)
+    parser.add_argument('--archive-after-days', type=int, default=30)
+    parser.add_argument('--ranges', type=parse_ranges, default=[7], help='Report ranges in days, comma separated')
+    parser.add_argument('--render-repeat', type=int, default=3, help='Timed PDF renders per range')
+    args = parser.parse_args()
+
+    result = MODES[args.mode](args)
+    with open(args.output, 'w') as output_file:
+        json.dump(result, output_file)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""Concurrent load generation and latency statistics for the benchmarks.
+
+Targets are either the Flask test client (in this process) or a server listening on a
+local port. Each thread gets its own test client or keep-alive HTTP connection.
+"""
+import functools
+import http.client
+import itertools
+import json
+import math
+import os
+import resource
+import threading
+import time
+from datetime import date, timedelta
+
+WRITE_LINE = 99  # Seeded without entries; the write benchmark posts here
+MINUTES_PER_DAY = 24 * 60
+
+def entry_payload(index, today):
+    # One-minute intervals, newest day first, so no two requests overlap
+    day = today - timedelta(days=index // MINUTES_PER_DAY)
+    minute = index % MINUTES_PER_DAY
+    end = (minute + 1) % MINUTES_PER_DAY
+    return {
+        'line_number': WRITE_LINE,
+        'from_time': f"{minute // 60:02d}:{minute % 60:02d}",
+        'to_time': f"{end // 60:02d}:{end % 60:02d}",
+        'shift_date': day.isoformat(),
+        'planned': 10,
+        'actual': 9,
+        'total_loss_time': 1,
+        'losses': [{'reason': 'Minor stop', 'loss_time': 1, 'remarks': 'benchmark'}]
+    }
+
+# Endpoint name -> function(index, today) returning (method, path, json body)
+ENDPOINTS = {
+    'health': lambda index, today: ('GET', '/health', None),
+    'daily_report': lambda index, today: ('GET', '/api/daily-report', None),
+    'report_daily': lambda index, today: ('GET', '/api/report/daily', None),
+    'report_weekly': lambda index, today: ('GET', '/api/report/weekly', None),
+    'add_entry': lambda index, today: ('POST', '/api/entry', entry_payload(index, today))
+}
+ENDPOINT_ORDER = ('health', 'daily_report', 'report_daily', 'report_weekly', 'add_entry')  # Writes last
+
+class ClientTarget:
+    """Requests go through the Flask test client in this process."""
+
+    def __init__(self, flask_app):
+        self.app = flask_app
+
+    def session(self):
+        return _ClientSession(self.app.test_client())
+
+class _ClientSession:
+    def __init__(self, client):
+        self.client = client
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        response.get_data()  # Drain streamed bodies
+        response.close()
+        return response.status_code
+
+    def close(self):
+        pass
+
+class HttpTarget:
+    """Requests go over HTTP/1.1 keep-alive connections to host:port."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    def session(self):
+        return _HttpSession(http.client.HTTPConnection(self.host, self.port, timeout=120))
+
+class _HttpSession:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def request(self, method, path, body=None):
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (http.client.HTTPException, OSError):
+            self.connection.close()  # Reconnects on the next request
+            raise
+
+    def close(self):
+        self.connection.close()
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+def summarize(latencies, errors, elapsed):
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'throughput': round(len(values) / elapsed, 1) if elapsed > 0 else None,
+        'p50_ms': _ms(percentile(values, 0.50)),
+        'p95_ms': _ms(percentile(values, 0.95)),
+        'p99_ms': _ms(percentile(values, 0.99))
+    }
+
+def run_load(target, make_request, requests, concurrency):
+    """Send `requests` requests from `concurrency` threads and summarize them.
+
+    make_request(index) returns (method, path, body) for the index-th request. Responses
+    with a status of 400 or above, and requests that raise, count as errors.
+    """
+    counter = itertools.count()
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal errors
+        session = target.session()
+        try:
+            while True:
+                index = next(counter)
+                if index >= requests:
+                    return
+                method, path, body = make_request(index)
+                started = time.perf_counter()
+                try:
+                    status = session.request(method, path, body)
+                except Exception:
+                    status = None
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    if status is None or status >= 400:
+                        errors += 1
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, name=f'load-{number}') for number in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+def time_calls(function, repeat):
+    """Call function() repeat times in a row and summarize the durations."""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call_started = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, 0, time.perf_counter() - started)
+
+def run_endpoints(target, requests, concurrency, write_offset=0, endpoints=ENDPOINT_ORDER):
+    """Load each endpoint in turn and return {endpoint: summary}.
+
+    The first request to each endpoint is timed on its own as cold_ms, since it pays for
+    empty caches (for reports, the PDF render); the loaded requests that follow mostly
+    measure the warm path.
+    """
+    today = date.today()
+    results = {}
+    for name in endpoints:
+        make_request = functools.partial(_indexed_request, ENDPOINTS[name], write_offset, today)
+        cold = run_load(target, make_request, 1, 1)
+        results[name] = run_load(target, lambda index: make_request(index + 1), requests, concurrency)
+        results[name]['cold_ms'] = cold['p50_ms']
+        results[name]['errors'] += cold['errors']
+    return results
+
+def _indexed_request(build, write_offset, today, index):
+    return build(write_offset + index, today)
+
+def peak_rss_mb():
+    """Peak resident set size of this process (Linux reports ru_maxrss in KiB)."""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def current_rss_mb():
+    """Resident set size of this process right now (VmRSS). Linux only."""
+    with open('/proc/self/status') as status_file:
+        for line in status_file:
+            if line.startswith('VmRSS:'):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+def process_tree_peak_rss_mb(pid):
+    """Sum of the peak RSS (VmHWM) of pid and all its descendants. Linux only."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat_file:
+                # The command name may contain spaces, so split after its closing paren
+                parent = int(stat_file.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/status') as status_file:
+                for line in status_file:
+                    if line.startswith('VmHWM:'):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return round(total_kb / 1024, 1)
@@ -0,0 +1,407 @@
+"""Run the benchmark scenarios, record the results and compare them against a baseline.
+
+    python benchmarks/run.py                                  # every scenario on SQLite
+    python benchmarks/run.py --scenarios client,gunicorn --requests 1000 --concurrency 16
+    python benchmarks/run.py --save-baseline                  # record benchmarks/baseline.json
+    python benchmarks/run.py --database-url postgresql://localhost/planvsactual_bench
+
+A fresh database is seeded once per run. With SQLite every scenario gets its own copy of
+it; a PostgreSQL database (which must start out empty) is shared by all scenarios.
+Results go to --output. When a baseline exists, any throughput or p50/p95 latency more than
+--threshold worse than the baseline, higher peak RSS, or new errors fail the run.
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from load import HttpTarget, process_tree_peak_rss_mb, run_endpoints, summarize
+
+# mode: how the scenario runs. server starts `python <command>` with {port} filled in and
+# loads it over HTTP; every other mode runs inprocess.py. Scenarios with `seeds` run once per
+# seed on a SQLite database of their own, seeded with the run's options updated by the seed.
+# Optional scenarios only run when named in --scenarios.
+SCENARIOS = {
+    'client': {
+        'mode': 'load',
+        'description': 'Flask test client, default settings'
+    },
+    'client-log-all': {
+        'mode': 'load',
+        'description': 'Flask test client, every request access record logged',
+        'env': {'LOG_REQUEST_SAMPLE_RATE': '1'}
+    },
+    'client-log-off': {
+        'mode': 'load',
+        'description': 'Flask test client, application logging at WARNING',
+        'env': {'LOG_LEVEL': 'WARNING'}
+    },
+    'client-metrics-off': {
+        'mode': 'load',
+        'description': 'Flask test client, /metrics instrumentation off',
+        'env': {'METRICS_ENABLED': '0'}
+    },
+    'gunicorn': {
+        'mode': 'server',
+        'description': 'gunicorn gthread workers as in the Procfile',
+        'command': ['-m', 'gunicorn', '--preload', '--workers=2', '--threads=4', '--worker-class=gthread',
+                    '--bind=127.0.0.1:{port}', 'app:create_app()'],
+        'requires': ['gunicorn']
+    },
+    'uvicorn': {
+        'mode': 'server',
+        'description': 'uvicorn serving asgi.py',
+        'command': ['-m', 'uvicorn', 'asgi:application', '--workers=2', '--host=127.0.0.1', '--port={port}',
+                    '--log-level=warning'],
+        'requires': ['uvicorn', 'a2wsgi']
+    },
+    'startup': {
+        'mode': 'startup',
+        'description': 'Import app.py and run create_app() in a new interpreter'
+    },
+    'archive': {
+        'mode': 'archive',
+        'description': 'Hot table size and query latency before and after archive-entries',
+        'sqlite_only': True  # It deletes the archived rows
+    },
+    'export': {
+        'mode': 'export',
+        'description': 'Stream every seeded entry through /api/export as CSV and NDJSON'
+    },
+    'ingest': {
+        'mode': 'ingest',
+        'description': 'Rows/sec through POST /api/entry one at a time vs /api/entries/bulk'
+    },
+    'render': {
+        'mode': 'reports',
+        'description': 'PDF render time and memory for 1, 7, 31 and 365 day reports',
+        'seeds': {'365d': {'days': 365}},
+        'args': ['--ranges', '1,7,31,365', '--render-repeat', '1']
+    },
+    'line-scaling': {
+        'mode': 'reports',
+        'description': 'Weekly report data and PDF render from 2 to 50 lines',
+        'seeds': {'2-lines': {'lines': 2, 'days': 31}, '10-lines': {'lines': 10, 'days': 31},
+                  '50-lines': {'lines': 50, 'days': 31}},
+        'args': ['--ranges', '7']
+    },
+    'analytics-year': {
+        'mode': 'analytics',
+        'description': '/api/analytics over a year of data for 20 lines',
+        'seeds': {'20-lines': {'lines': 20, 'days': 365}}
+    },
+    'report-scaling': {
+        'mode': 'reports',
+        'description': 'Weekly report data and daily entries as history grows to a million entries',
+        'seeds': {f'{days}d': {'lines': 4, 'entries_per_day': 96, 'days': days} for days in (30, 300, 2700)},
+        'args': ['--ranges', '7', '--render-repeat', '1'],
+        'optional': True  # Seeding the largest history takes minutes
+    }
+}
+
+ASYNC_DRIVER_PACKAGES = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg'}
+STARTUP_RUNS = 5
+WRITE_OFFSET_STEP = 100000  # Keeps the write benchmark's intervals distinct across scenarios
+
+LOWER_IS_BETTER = ('p50_ms', 'p95_ms', 'peak_rss_mb')
+HIGHER_IS_BETTER = ('throughput', 'rows_per_sec')
+
+def child_env(database_url, scenario_dir, extra=None):
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': database_url,
+        'REPORT_CACHE_DIR': os.path.join(scenario_dir, 'reports'),
+        'ARCHIVE_DIR': os.path.join(scenario_dir, 'archive'),
+        'PYTHONPATH': os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    })
+    env.update(extra or {})
+    return env
+
+def missing_requirements(scenario, database_url):
+    packages = list(scenario.get('requires', []))
+    if 'asgi:application' in scenario.get('command', []):
+        packages.append(ASYNC_DRIVER_PACKAGES.get(database_url.split(':', 1)[0].split('+')[0], 'aiosqlite'))
+    return [package for package in packages if importlib.util.find_spec(package) is None]
+
+def run_inprocess(mode, env, scenario_dir, args, extra_args=(), requests=None):
+    output = os.path.join(scenario_dir, f'{mode}.json')
+    command = [
+        sys.executable, os.path.join(BENCHMARKS_DIR, 'inprocess.py'), mode, '--output', output,
+        '--requests', str(requests or args.requests), '--concurrency', str(args.concurrency), *extra_args
+    ]
+    subprocess.run(command, env=env, cwd=scenario_dir, check=True)
+    with open(output) as output_file:
+        return json.load(output_file)
+
+def run_startup(env, scenario_dir, args):
+    runs = []
+    wall = []
+    for _ in range(STARTUP_RUNS):
+        started = time.perf_counter()
+        runs.append(run_inprocess('startup', env, scenario_dir, args))
+        wall.append(time.perf_counter() - started)
+
+    def times(key):
+        return sorted(run[key] / 1000 for run in runs)
+
+    return {
+        'import': summarize(times('import_ms'), 0, 0),
+        'create_app': summarize(times('create_app_ms'), 0, 0),
+        'process': summarize(wall, 0, 0),
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in runs)
+    }
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+def wait_until_ready(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        try:
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            connection.close()
+        time.sleep(0.2)
+    raise RuntimeError(f"Server did not answer /health within {timeout} seconds")
+
+def run_server(scenario, env, scenario_dir, args, write_offset):
+    port = free_port()
+    command = [sys.executable] + [part.format(port=port) for part in scenario['command']]
+    log_path = os.path.join(scenario_dir, 'server.log')
+    with open(log_path, 'w') as log_file:
+        process = subprocess.Popen(command, env=env, cwd=scenario_dir, stdout=log_file, stderr=subprocess.STDOUT)
+        try:
+            wait_until_ready(port, process)
+            endpoints = run_endpoints(HttpTarget('127.0.0.1', port), args.requests, args.concurrency, write_offset)
+            return {'endpoints': endpoints, 'peak_rss_mb': process_tree_peak_rss_mb(process.pid)}
+        except RuntimeError as e:
+            raise RuntimeError(f"{e}, see {log_path}")
+        finally:
+            process.send_signal(signal.SIGTERM)
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+def run_scenario(name, database_url, template_path, workdir, args, position):
+    scenario = SCENARIOS[name]
+    sqlite = database_url.startswith('sqlite')
+    if scenario.get('sqlite_only') and not sqlite:
+        return {'skipped': 'only runs against the seeded SQLite copy'}
+    missing = missing_requirements(scenario, database_url)
+    if missing:
+        return {'skipped': f"not installed: {', '.join(missing)}"}
+
+    scenario_dir = os.path.join(workdir, name)
+    os.makedirs(scenario_dir)
+    if 'seeds' in scenario:
+        return run_seeded(scenario, scenario_dir, args)
+    if sqlite:
+        scenario_db = os.path.join(scenario_dir, 'production.db')
+        shutil.copyfile(template_path, scenario_db)
+        database_url = f'sqlite:///{scenario_db}'
+    env = child_env(database_url, scenario_dir, scenario.get('env'))
+    write_offset = position * WRITE_OFFSET_STEP
+
+    if scenario['mode'] == 'load':
+        return run_inprocess('load', env, scenario_dir, args, ['--write-offset', str(write_offset)])
+    if scenario['mode'] == 'startup':
+        return run_startup(env, scenario_dir, args)
+    if scenario['mode'] == 'archive':
+        # Each query runs one at a time, so a tenth of the requests is plenty
+        return run_inprocess('archive', env, scenario_dir, args, [
+            '--archive-after-days', str(args.archive_after_days)
+        ], requests=max(5, args.requests // 10))
+    if scenario['mode'] == 'export':
+        return run_inprocess('export', env, scenario_dir, args)
+    if scenario['mode'] == 'ingest':
+        return run_inprocess('ingest', env, scenario_dir, args, ['--write-offset', str(write_offset)])
+    return run_server(scenario, env, scenario_dir, args, write_offset)
+
+def run_seeded(scenario, scenario_dir, args):
+    results = {}
+    for label, overrides in scenario['seeds'].items():
+        seed_path = os.path.join(scenario_dir, f'{label}.db')
+        database_url = f'sqlite:///{seed_path}'
+        seed_seconds = seed_database(database_url, scenario_dir, dict(seed_options(args), **overrides))
+        env = child_env(database_url, scenario_dir, scenario.get('env'))
+        results[label] = run_inprocess(scenario['mode'], env, scenario_dir, args, scenario.get('args', ()))
+        results[label]['seed_seconds'] = seed_seconds
+        os.remove(seed_path)
+    return results
+
+def seed_options(args):
+    return {key: getattr(args, key) for key in ('lines', 'days', 'entries_per_day', 'losses_per_entry')}
+
+def seed_database(database_url, workdir, options):
+    command = [
+        sys.executable, os.path.join(BENCHMARKS_DIR, 'seed.py'), '--database-url', database_url,
+        '--lines', str(options['lines']), '--days', str(options['days']),
+        '--entries-per-day', str(options['entries_per_day']), '--losses-per-entry', str(options['losses_per_entry'])
+    ]
+    started = time.perf_counter()
+    subprocess.run(command, env=child_env(database_url, workdir), cwd=workdir, check=True)
+    return round(time.perf_counter() - started, 3)
+
+def flatten(results, path=()):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, path + (key,))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path + (key,), value
+
+def compare(current, baseline, threshold, min_delta_ms):
+    """Return a description of every metric that regressed beyond the threshold."""
+    previous = dict(flatten(baseline['scenarios']))
+    regressions = []
+    for path, value in flatten(current['scenarios']):
+        before = previous.get(path)
+        if before is None:
+            continue
+        metric = path[-1]
+        label = '.'.join(path)
+        if metric == 'errors' and value > before:
+            regressions.append(f"{label}: {before} -> {value}")
+        elif metric in HIGHER_IS_BETTER and value < before * (1 - threshold):
+            regressions.append(f"{label}: {before} -> {value} (-{(1 - value / before) * 100:.0f}%)")
+        elif metric in LOWER_IS_BETTER and before > 0 and value > before * (1 + threshold):
+            if metric.endswith('_ms') and value - before < min_delta_ms:
+                continue  # Too small to tell from noise
+            regressions.append(f"{label}: {before} -> {value} (+{(value / before - 1) * 100:.0f}%)")
+    return regressions
+
+def print_summary(results):
+    print(f"{'scenario':<16} {'endpoint':<26} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>6}")
+    for name, result in results['scenarios'].items():
+        if 'skipped' in result or 'failed' in result:
+            print(f"{name:<16} {result.get('skipped') or result.get('failed')}")
+            continue
+        for path, stats in _summaries(result):
+            print(
+                f"{name:<16} {'.'.join(path):<26} {_cell(stats['throughput'])} {_cell(stats.get('p50_ms'))} "
+                f"{_cell(stats.get('p95_ms'))} {_cell(stats.get('p99_ms'))} {stats.get('errors', 0):>6}"
+            )
+        if 'peak_rss_mb' in result:
+            print(f"{name:<16} {'peak RSS':<26} {result['peak_rss_mb']:>8} MB")
+
+def _summaries(result, path=()):
+    for key, value in result.items():
+        if isinstance(value, dict) and ('p50_ms' in value or 'throughput' in value):
+            yield path + (key,), value
+        elif isinstance(value, dict):
+            yield from _summaries(value, path + (key,))
+
+def _cell(value):
+    return f"{'-' if value is None else value:>9}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', default=','.join(name for name, scenario in SCENARIOS.items()
+                                                        if not scenario.get('optional')),
+                        help=f"Comma separated, from: {', '.join(SCENARIOS)} (default: all but the optional ones)")
+    parser.add_argument('--database-url', help='Seed and use this (empty) database instead of a temporary SQLite file')
+    parser.add_argument('--lines', type=int, default=4)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--entries-per-day', type=int, default=16, help='Entries per line per day')
+    parser.add_argument('--losses-per-entry', type=int, default=2, help='Maximum losses per entry')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--archive-after-days', type=int, default=30)
+    parser.add_argument('--output', default=os.path.join(BENCHMARKS_DIR, 'results.json'))
+    parser.add_argument('--baseline', default=os.path.join(BENCHMARKS_DIR, 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results to --baseline as well')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed relative regression (0.25 = 25%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                        help='Ignore latency regressions smaller than this many milliseconds')
+    parser.add_argument('--keep', action='store_true', help='Keep the working directory (databases, server logs)')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    workdir = tempfile.mkdtemp(prefix='planvsactual-bench-')
+    template_path = os.path.join(workdir, 'seed.db')
+    database_url = args.database_url or f'sqlite:///{template_path}'
+    parameters = {
+        key: getattr(args, key)
+        for key in ('lines', 'days', 'entries_per_day', 'losses_per_entry', 'requests', 'concurrency',
+                    'archive_after_days')
+    }
+    results = {
+        'meta': {
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'database': database_url.split(':', 1)[0],
+            'parameters': parameters
+        },
+        'scenarios': {}
+    }
+
+    try:
+        results['meta']['seed_seconds'] = seed_database(database_url, workdir, seed_options(args))
+        for position, name in enumerate(names):
+            print(f"Running {name}: {SCENARIOS[name]['description']}", flush=True)
+            try:
+                results['scenarios'][name] = run_scenario(name, database_url, template_path, workdir, args, position)
+            except (RuntimeError, subprocess.CalledProcessError) as e:
+                results['scenarios'][name] = {'failed': str(e)}
+    finally:
+        if args.keep:
+            print(f"Working directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    print_summary(results)
+    print(f"Results written to {args.output}")
+
+    failed = [name for name, result in results['scenarios'].items() if 'failed' in result]
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['meta'].get('parameters') != parameters or baseline['meta'].get('database') != results['meta']['database']:
+            raise SystemExit("The baseline was recorded with different parameters, rerun with the same options "
+                             "or record a new one with --save-baseline")
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(f"{len(regressions)} metrics regressed more than {args.threshold:.0%} against the baseline")
+        print(f"No regressions against {args.baseline}")
+    if failed:
+        raise SystemExit(f"Scenarios failed: {', '.join(failed)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Seed a database with synthetic production entries for the benchmarks.
+
+    python benchmarks/seed.py --database-url sqlite:////tmp/bench.db --lines 4 --days 90
+
+Every line gets entries_per_day back-to-back intervals on each of the last `days` days
+(today included), each with up to losses_per_entry losses. The daily summaries are
+rebuilt afterwards, exactly as `flask rebuild-summaries` would.
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, datetime, time, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from load import WRITE_LINE
+
+REASONS = ['Breakdown', 'Changeover', 'Material shortage', 'Quality check', 'Minor stop', 'No operator']
+
+def seed(lines=4, days=90, entries_per_day=16, losses_per_entry=2, today=None, batch_size=5000, rng_seed=0):
+    """Insert the synthetic data through the app's models. Returns the number of entries."""
+    from sqlalchemy import insert
+    import app as planvsactual
+
+    rng = random.Random(rng_seed)
+    today = today or date.today()
+    slot = timedelta(minutes=24 * 60 // entries_per_day)
+
+    with planvsactual.app.app_context():
+        if not planvsactual.init_db():
+            raise SystemExit("Database initialization failed")
+        db = planvsactual.db
+        if planvsactual.ProductionEntry.query.first() is not None:
+            raise SystemExit("The database already has entries, seed an empty one")
+
+        existing = {number for (number,) in db.session.query(planvsactual.Line.number)}
+        for number in list(range(1, lines + 1)) + [WRITE_LINE]:
+            if number not in existing:
+                db.session.add(planvsactual.Line(number=number, name=f"Line {number}", shift_calendar=[]))
+        db.session.commit()
+
+        def entry_rows():
+            for offset in range(days - 1, -1, -1):
+                day = today - timedelta(days=offset)
+                for line_number in range(1, lines + 1):
+                    for index in range(entries_per_day):
+                        start_at = datetime.combine(day, time()) + index * slot
+                        end_at = start_at + slot
+                        losses = [
+                            (rng.choice(REASONS), rng.randint(1, 15))
+                            for _ in range(rng.randint(0, losses_per_entry))
+                        ]
+                        planned = rng.randint(80, 120)
+                        yield {
+                            'timestamp': end_at,
+                            'line_number': line_number,
+                            'from_time': start_at.time(),
+                            'to_time': end_at.time(),
+                            'start_at': start_at,
+                            'end_at': end_at,
+                            'shift': None,
+                            'shift_date': day,
+                            'planned': planned,
+                            'actual': max(0, planned - rng.randint(0, 30)),
+                            'total_loss_time': sum(loss_time for _, loss_time in losses),
+                            'version': 1
+                        }, losses
+
+        count = 0
+        rows = entry_rows()
+        while True:
+            batch = [row for _, row in zip(range(batch_size), rows)]
+            if not batch:
+                break
+            entry_ids = db.session.scalars(
+                insert(planvsactual.ProductionEntry).returning(
+                    planvsactual.ProductionEntry.id, sort_by_parameter_order=True
+                ),
+                [values for values, _ in batch]
+            ).all()
+            loss_rows = [
+                {'production_entry_id': entry_id, 'reason': reason, 'loss_time': loss_time, 'remarks': 'seeded'}
+                for entry_id, (_, losses) in zip(entry_ids, batch)
+                for reason, loss_time in losses
+            ]
+            if loss_rows:
+                db.session.execute(insert(planvsactual.LossEntry), loss_rows)
+            db.session.commit()
+            count += len(batch)
+
+        planvsactual.rebuild_daily_summaries()
+        return count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--lines', type=int, default=4)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--entries-per-day', type=int, default=16, help='Entries per line per day')
+    parser.add_argument('--losses-per-entry', type=int, default=2, help='Maximum losses per entry')
+    args = parser.parse_args()
+
+    # app.py reads its configuration from the environment when it is imported
+    os.environ['DATABASE_URL'] = args.database_url
+    count = seed(args.lines, args.days, args.entries_per_day, args.losses_per_entry)
+    print(f"Seeded {count} entries")
+
+if __name__ == '__main__':
+    main()
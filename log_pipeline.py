@@ -0,0 +1,192 @@
+import json
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Request threads only put records on an in-memory queue. A single listener thread
+# drains the queue in batches, formats the records as JSON lines and writes each
+# batch with one flush, so request latency no longer depends on disk or stdout speed.
+
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record. Anything passed through `extra` becomes a field."""
+
+    def format(self, record):
+        payload = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'source': f"{record.pathname}:{record.lineno}"
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and key != 'sampled':
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        return json.dumps(payload, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records logged with extra={'sampled': True}."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if not getattr(record, 'sampled', False) or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue records without ever blocking; count what is dropped when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Render the message and traceback on the calling thread (the record's args and
+        # exc_info may not be safe to touch later), but leave the rest of the record
+        # intact so the JSON formatter still sees the `extra` fields
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class BatchWriteMixin:
+    """Write a list of records with a single flush."""
+
+    def handle_batch(self, records):
+        records = [record for record in records if record.levelno >= self.level and self.filter(record)]
+        if not records:
+            return
+        with self.lock:
+            try:
+                if self.stream is None:
+                    self.stream = self._open()
+                for record in records:
+                    if hasattr(self, 'shouldRollover') and self.shouldRollover(record):
+                        self.doRollover()
+                    self.stream.write(self.format(record) + self.terminator)
+                self.stream.flush()
+            except Exception:
+                self.handleError(records[-1])
+
+class BatchStreamHandler(BatchWriteMixin, logging.StreamHandler):
+    pass
+
+class BatchRotatingFileHandler(BatchWriteMixin, RotatingFileHandler):
+    pass
+
+class BatchingQueueListener(QueueListener):
+    """A QueueListener that hands its handlers up to batch_size records at a time."""
+
+    def __init__(self, log_queue, *handlers, batch_size=200):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self._stopping = threading.Event()
+
+    def start(self):
+        self._stopping.clear()
+        super().start()
+
+    def stop(self):
+        # Safe to call more than once (e.g. explicitly and again from atexit)
+        if self._thread is not None:
+            super().stop()
+
+    def enqueue_sentinel(self):
+        # The writer thread checks the flag after every batch. The sentinel only wakes it
+        # up when the queue is empty, so a full queue (where it can't be added) is fine.
+        self._stopping.set()
+        try:
+            self.queue.put_nowait(self._sentinel)
+        except queue.Full:
+            pass
+
+    def _monitor(self):
+        while True:
+            batch = [self.dequeue(True)]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+
+            # Other threads may keep logging after stop(), so the sentinel isn't necessarily
+            # last (or queued at all). Write what is queued at that point and exit.
+            stop = self._stopping.is_set()
+            if stop:
+                for _ in range(self.queue.qsize()):
+                    try:
+                        batch.append(self.dequeue(False))
+                    except queue.Empty:
+                        break
+            records = [record for record in batch if record is not self._sentinel]
+            if records:
+                self.handle_batch(records)
+            if stop:
+                break
+
+    def handle_batch(self, records):
+        for handler in self.handlers:
+            if hasattr(handler, 'handle_batch'):
+                handler.handle_batch(records)
+            else:
+                for record in records:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+
+def configure_logging(logger, log_file=None, max_bytes=10 * 1024 * 1024, backup_count=10,
+                      sample_rate=1.0, queue_size=10000, level=logging.INFO):
+    """Route logger through a queue to a batching writer thread and return the listener.
+
+    Records go to log_file (rotating) when given, otherwise to stdout. The caller is
+    responsible for stopping the listener at exit so queued records are flushed.
+    """
+    if log_file:
+        output = BatchRotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)
+    else:
+        output = BatchStreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+    output.setLevel(level)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    listener = BatchingQueueListener(log_queue, output)
+    listener.start()
+    
+    # Threads don't survive fork(), so a preforked worker (gunicorn --preload) starts its
+    # own writer thread, with a fresh queue in case the parent's lock was held at the fork
+    def restart_in_child():
+        listener.queue = queue_handler.queue = queue.Queue(maxsize=queue_size)
+        listener._thread = None
+        listener.start()
+    os.register_at_fork(after_in_child=restart_in_child)
+    return listener
@@ -0,0 +1,199 @@
+from io import BytesIO
+from xml.sax.saxutils import escape
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+
+# Paragraph and table styles are built once and shared by every report.
+# ReportLab only reads a TableStyle when it is applied, so one instance can
+# style any number of tables.
+_styles = getSampleStyleSheet()
+
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_styles['Heading1'],
+    fontSize=16,
+    spaceAfter=30
+)
+
+HEADING2_STYLE = ParagraphStyle(
+    'Heading2',
+    parent=_styles['Heading2'],
+    fontSize=14,
+    spaceAfter=12
+)
+
+SUMMARY_COLUMNS = ['Date', 'Planned', 'Actual', 'Total Loss Time']
+SUMMARY_COL_WIDTHS = [100, 100, 100, 100]
+
+SUMMARY_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige]),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+LOSS_COLUMNS = ['Date', 'Loss Reason', 'Time Range', 'Duration', 'Remarks']
+LOSS_COL_WIDTHS = [70, 120, 80, 60, 170]
+
+LOSS_TABLE_STYLE = TableStyle([
+    # Header row styling
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+
+    # Content styling, with alternating row colors as a single banding command
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.whitesmoke, colors.white]),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+
+    # Align durations to center
+    ('ALIGN', (3, 0), (3, -1), 'CENTER'),
+])
+
+def _total_row_commands(row):
+    return [
+        ('BACKGROUND', (0, row), (-1, row), colors.lightgrey),
+        ('FONTNAME', (0, row), (-1, row), 'Helvetica-Bold'),
+        ('LINEABOVE', (0, row), (-1, row), 1, colors.grey),
+        ('LINEBELOW', (0, row), (-1, row), 1, colors.grey),
+    ]
+
+# ReportLab measures every remaining row of a table again each time it splits it across a
+# page, so a single table costs time quadratic in its length. Long tables are built as a
+# run of tables of at most this many body rows, each starting on a new date with its own
+# header row.
+TABLE_CHUNK_ROWS = 120
+
+def build_tables(groups, header, col_widths, style, marked_row_commands=None):
+    """Lay out groups of rows as one or more tables that never split a group.
+
+    groups yields (rows, marked) pairs, where marked lists the indexes of rows within the
+    group that get marked_row_commands(row) on top of style.
+    """
+    tables = []
+    rows = [header]
+    marked = []
+
+    def flush():
+        table = Table(rows, colWidths=col_widths, repeatRows=1)
+        table.setStyle(style)
+        if marked:
+            table.setStyle([command for row in marked for command in marked_row_commands(row)])
+        tables.append(table)
+
+    for group_rows, group_marked in groups:
+        if len(rows) > 1 and len(rows) - 1 + len(group_rows) > TABLE_CHUNK_ROWS:
+            flush()
+            rows = [header]
+            marked = []
+        marked.extend(len(rows) + index for index in group_marked)
+        rows.extend(group_rows)
+
+    if len(rows) > 1:
+        flush()
+    return tables
+
+def build_summary_tables(line_data):
+    """Tables holding the daily totals for every date of a line."""
+    def summary_row(entry_date):
+        daily_data = line_data[entry_date]
+        return [
+            entry_date.strftime('%Y-%m-%d'),
+            str(daily_data['planned']),
+            str(daily_data['actual']),
+            f"{daily_data['total_loss_time']} min"
+        ]
+
+    groups = (([summary_row(entry_date)], []) for entry_date in sorted(line_data.keys()))
+    return build_tables(groups, SUMMARY_COLUMNS, SUMMARY_COL_WIDTHS, SUMMARY_TABLE_STYLE)
+
+def _daily_loss_rows(day_label, losses):
+    """Loss rows for one date and the indexes of its per-reason total rows.
+
+    Total rows are recorded by index as they are appended, so they can be styled
+    without inspecting cell text.
+    """
+    rows = []
+    total_rows = []
+    for reason, loss_data in losses.items():
+        for occurrence in loss_data['occurrences']:
+            rows.append([
+                day_label,
+                reason,
+                occurrence['time_range'],
+                f"{occurrence['loss_time']} min",
+                occurrence['remarks'] or ''
+            ])
+
+        # Add a summary row for this reason
+        total_rows.append(len(rows))
+        rows.append([
+            day_label,
+            f"Total for {reason}",
+            '',
+            f"{loss_data['total_time']} min",
+            ''
+        ])
+    return rows, total_rows
+
+def build_loss_tables(line_data):
+    """Tables holding the loss details for every date of a line; empty without losses."""
+    groups = (
+        _daily_loss_rows(entry_date.strftime('%Y-%m-%d'), line_data[entry_date]['losses'])
+        for entry_date in sorted(line_data.keys()) if line_data[entry_date]['losses']
+    )
+    return build_tables(groups, LOSS_COLUMNS, LOSS_COL_WIDTHS, LOSS_TABLE_STYLE, _total_row_commands)
+
+def build_line_section(line_name, line_data):
+    elements = [Paragraph(escape(line_name), HEADING2_STYLE)]
+
+    if line_data:
+        elements.extend(build_summary_tables(line_data))
+        elements.append(Spacer(1, 20))
+
+        loss_tables = build_loss_tables(line_data)
+        if loss_tables:
+            elements.append(Paragraph("Loss Details:", HEADING2_STYLE))
+            elements.extend(loss_tables)
+            elements.append(Spacer(1, 20))
+
+    elements.append(Spacer(1, 30))
+    return elements
+
+def render_report_pdf(report_data, start_date, end_date, line_names=None):
+    """Render report data to PDF bytes. Touches no app or database state.
+
+    Each line in report_data gets its own section, starting on a new page.
+    line_names maps line numbers to display names.
+    """
+    line_names = line_names or {}
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+
+    title = f"Production Report ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})"
+    elements = [Paragraph(title, TITLE_STYLE)]
+
+    # Process each line
+    for index, line_number in enumerate(sorted(report_data)):
+        if index > 0:
+            elements.append(PageBreak())
+        line_name = line_names.get(line_number, f"Line {line_number}")
+        elements.extend(build_line_section(line_name, report_data[line_number]))
+
+    doc.build(elements)
+    return buffer.getvalue()
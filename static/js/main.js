@@ -66,6 +66,9 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // If data is provided, populate the fields
         if (data) {
+            if (data.id) {
+                entry.dataset.lossId = data.id;
+            }
             entry.querySelector('.loss-reason').value = data.reason || '';
             entry.querySelector('.loss-time').value = data.loss_time || '';
             entry.querySelector('.loss-remarks').value = data.remarks || '';
@@ -78,6 +81,8 @@ document.addEventListener('DOMContentLoaded', function() {
     // Function to get all loss entries
     function getLossEntries() {
         return Array.from(document.querySelectorAll('.loss-entry')).map(entry => ({
+            // Existing losses keep their id so the server only updates what changed
+            id: entry.dataset.lossId ? parseInt(entry.dataset.lossId) : undefined,
             reason: entry.querySelector('.loss-reason').value.trim(),
             loss_time: parseInt(entry.querySelector('.loss-time').value) || 0,
             remarks: entry.querySelector('.loss-remarks').value.trim()
@@ -111,16 +116,28 @@ document.addEventListener('DOMContentLoaded', function() {
                     planned: planned,
                     actual: actual,
                     total_loss_time: parseInt(totalLossTimeInput.value) || 0,
-                    losses: getLossEntries()
+                    losses: getLossEntries(),
+                    // The version the edit started from; the server rejects it if the entry changed since
+                    version: entryId ? parseInt(document.getElementById('entryVersion').value) : undefined
                 })
             });
             
             if (!response.ok) {
-                throw new Error('Failed to save entry');
+                const result = await response.json().catch(() => ({}));
+                if (response.status === 409 && result.entry) {
+                    // Someone else saved this entry first; reload their version into the form
+                    await loadEntry(result.entry.id);
+                    throw new Error('This entry was changed by someone else. The form now shows the latest version; please reapply your changes.');
+                }
+                throw new Error(result.error || 'Failed to save entry');
             }
             
             clearForm();
-            await updateDailySummary();
+            
+            // The live feed delivers the change; only refetch without it
+            if (!liveFeed || liveFeed.readyState !== EventSource.OPEN) {
+                await updateDailySummary();
+            }
         } catch (error) {
             console.error('Error:', error);
             alert(error.message);
@@ -130,6 +147,7 @@ document.addEventListener('DOMContentLoaded', function() {
     // Function to clear the form
     window.clearForm = function() {
         document.getElementById('entryId').value = '';
+        document.getElementById('entryVersion').value = '';
         form.reset();
         lossEntries.innerHTML = '';
         lossSection.style.display = 'none';
@@ -148,6 +166,7 @@ document.addEventListener('DOMContentLoaded', function() {
             
             // Populate form fields
             document.getElementById('entryId').value = entryId;
+            document.getElementById('entryVersion').value = data.version;
             document.getElementById('lineNumber').value = data.line_number;
             document.getElementById('fromTime').value = data.from_time;
             document.getElementById('toTime').value = data.to_time;
@@ -176,8 +195,138 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    // Function to update the daily summary
-    async function updateDailySummary() {
+    // Lines rendered by the server, one tab pane per line
+    const lineNumbers = Array.from(document.querySelectorAll('[data-line-number]'))
+        .map(pane => parseInt(pane.dataset.lineNumber));
+
+    // Today's entries keyed by id, kept current by the live feed
+    let dailyEntries = new Map();
+    let dailyDate = null;
+    let liveFeed = null;
+
+    // Function to render one line's summary from the entries held in memory
+    function renderLine(lineNum) {
+        const lineEntries = Array.from(dailyEntries.values())
+            .filter(entry => entry.line_number === lineNum)
+            .sort((a, b) => a.from_time.localeCompare(b.from_time) || a.id - b.id);
+        
+        // Calculate totals
+        const totals = lineEntries.reduce((acc, entry) => ({
+            planned: acc.planned + entry.planned,
+            actual: acc.actual + entry.actual,
+            lossTime: acc.lossTime + entry.total_loss_time
+        }), { planned: 0, actual: 0, lossTime: 0 });
+        
+        // Update summary stats
+        document.getElementById(`totalPlanned${lineNum}`).textContent = totals.planned;
+        document.getElementById(`totalActual${lineNum}`).textContent = totals.actual;
+        document.getElementById(`totalLossTime${lineNum}`).textContent = `${totals.lossTime} min`;
+        
+        // Generate entries HTML
+        const entriesHtml = lineEntries.map(entry => {
+            const lossesHtml = entry.losses.map(loss => `
+                <div class="ms-3 small">
+                    <strong>${loss.reason}</strong> (${loss.loss_time} min)
+                    ${loss.remarks ? `: ${loss.remarks}` : ''}
+                </div>
+            `).join('');
+            
+            return `
+                <div class="card mb-2">
+                    <div class="card-body p-3">
+                        <div class="d-flex justify-content-between align-items-start">
+                            <div>
+                                <strong>${entry.from_time} - ${entry.to_time}</strong>
+                                <div>Planned: ${entry.planned} | Actual: ${entry.actual}</div>
+                                ${entry.total_loss_time > 0 ? `<div class="text-danger">Loss Time: ${entry.total_loss_time} min</div>` : ''}
+                            </div>
+                            <button class="btn btn-outline-primary btn-sm" onclick="loadEntry(${entry.id})">
+                                Edit
+                            </button>
+                        </div>
+                        ${lossesHtml}
+                    </div>
+                </div>`;
+        }).join('');
+        
+        document.getElementById(`dailyEntries${lineNum}`).innerHTML = 
+            entriesHtml || '<p class="text-muted">No entries for today</p>';
+        
+        // Generate loss summary with time ranges and remarks
+        const lossSummary = {};
+        lineEntries.forEach(entry => {
+            entry.losses.forEach(loss => {
+                const key = loss.reason;
+                if (!lossSummary[key]) {
+                    lossSummary[key] = {
+                        totalTime: 0,
+                        occurrences: []
+                    };
+                }
+                lossSummary[key].totalTime += loss.loss_time;
+                lossSummary[key].occurrences.push({
+                    timeRange: `${entry.from_time}-${entry.to_time}`,
+                    lossTime: loss.loss_time,
+                    remarks: loss.remarks
+                });
+            });
+        });
+        
+        const lossSummaryHtml = Object.entries(lossSummary)
+            .map(([reason, data]) => {
+                const occurrencesHtml = data.occurrences
+                    .map(occ => `
+                        <div class="ms-3 small">
+                            <span class="text-muted">${occ.timeRange}</span>: 
+                            ${occ.lossTime} min
+                            ${occ.remarks ? `<br><span class="text-muted">Remarks: ${occ.remarks}</span>` : ''}
+                        </div>
+                    `).join('');
+                
+                return `
+                    <div class="card mb-2">
+                        <div class="card-body p-2">
+                            <div><strong>${reason}</strong>: Total ${data.totalTime} minutes</div>
+                            ${occurrencesHtml}
+                        </div>
+                    </div>
+                `;
+            }).join('');
+        
+        document.getElementById(`lossSummary${lineNum}`).innerHTML = 
+            lossSummaryHtml || '<p class="text-muted">No losses recorded</p>';
+    }
+
+    function renderDailySummary(lineNums = lineNumbers) {
+        lineNums.filter(lineNum => lineNumbers.includes(lineNum)).forEach(renderLine);
+    }
+
+    // Replace all entries with a full snapshot
+    function applySnapshot(snapshot) {
+        dailyDate = snapshot.date;
+        dailyEntries = new Map(snapshot.entries.map(entry => [entry.id, entry]));
+        renderDailySummary();
+    }
+
+    // Apply a single added or updated entry in place and re-render only the affected lines
+    function applyEntryEvent(event) {
+        if (event.date !== dailyDate) {
+            return;
+        }
+        
+        const previous = dailyEntries.get(event.entry.id);
+        dailyEntries.set(event.entry.id, event.entry);
+        
+        const lineNums = new Set([event.entry.line_number]);
+        if (previous) {
+            lineNums.add(previous.line_number);
+        }
+        renderDailySummary(Array.from(lineNums));
+    }
+
+    // Function to update the daily summary with a full fetch. The response carries an
+    // ETag, so repeated fetches of an unchanged day are answered with 304 Not Modified.
+    async function updateDailySummary(quiet = false) {
         try {
             const response = await fetch('/api/daily-report');
             if (!response.ok) {
@@ -185,112 +334,87 @@ document.addEventListener('DOMContentLoaded', function() {
             }
             
             const entries = await response.json();
-            
-            // Group entries by line
-            const lines = {1: [], 2: []};
-            entries.forEach(entry => lines[entry.line_number].push(entry));
-            
-            // Update each line's summary
-            [1, 2].forEach(lineNum => {
-                const lineEntries = lines[lineNum];
-                
-                // Calculate totals
-                const totals = lineEntries.reduce((acc, entry) => ({
-                    planned: acc.planned + entry.planned,
-                    actual: acc.actual + entry.actual,
-                    lossTime: acc.lossTime + entry.total_loss_time
-                }), { planned: 0, actual: 0, lossTime: 0 });
-                
-                // Update summary stats
-                document.getElementById(`totalPlanned${lineNum}`).textContent = totals.planned;
-                document.getElementById(`totalActual${lineNum}`).textContent = totals.actual;
-                document.getElementById(`totalLossTime${lineNum}`).textContent = `${totals.lossTime} min`;
-                
-                // Generate entries HTML
-                const entriesHtml = lineEntries.map(entry => {
-                    const lossesHtml = entry.losses.map(loss => `
-                        <div class="ms-3 small">
-                            <strong>${loss.reason}</strong> (${loss.loss_time} min)
-                            ${loss.remarks ? `: ${loss.remarks}` : ''}
-                        </div>
-                    `).join('');
-                    
-                    return `
-                        <div class="card mb-2">
-                            <div class="card-body p-3">
-                                <div class="d-flex justify-content-between align-items-start">
-                                    <div>
-                                        <strong>${entry.from_time} - ${entry.to_time}</strong>
-                                        <div>Planned: ${entry.planned} | Actual: ${entry.actual}</div>
-                                        ${entry.total_loss_time > 0 ? `<div class="text-danger">Loss Time: ${entry.total_loss_time} min</div>` : ''}
-                                    </div>
-                                    <button class="btn btn-outline-primary btn-sm" onclick="loadEntry(${entry.id})">
-                                        Edit
-                                    </button>
-                                </div>
-                                ${lossesHtml}
-                            </div>
-                        </div>`;
-                }).join('');
-                
-                document.getElementById(`dailyEntries${lineNum}`).innerHTML = 
-                    entriesHtml || '<p class="text-muted">No entries for today</p>';
-                
-                // Generate loss summary with time ranges and remarks
-                const lossSummary = {};
-                lineEntries.forEach(entry => {
-                    entry.losses.forEach(loss => {
-                        const key = loss.reason;
-                        if (!lossSummary[key]) {
-                            lossSummary[key] = {
-                                totalTime: 0,
-                                occurrences: []
-                            };
-                        }
-                        lossSummary[key].totalTime += loss.loss_time;
-                        lossSummary[key].occurrences.push({
-                            timeRange: `${entry.from_time}-${entry.to_time}`,
-                            lossTime: loss.loss_time,
-                            remarks: loss.remarks
-                        });
-                    });
-                });
-                
-                const lossSummaryHtml = Object.entries(lossSummary)
-                    .map(([reason, data]) => {
-                        const occurrencesHtml = data.occurrences
-                            .map(occ => `
-                                <div class="ms-3 small">
-                                    <span class="text-muted">${occ.timeRange}</span>: 
-                                    ${occ.lossTime} min
-                                    ${occ.remarks ? `<br><span class="text-muted">Remarks: ${occ.remarks}</span>` : ''}
-                                </div>
-                            `).join('');
-                        
-                        return `
-                            <div class="card mb-2">
-                                <div class="card-body p-2">
-                                    <div><strong>${reason}</strong>: Total ${data.totalTime} minutes</div>
-                                    ${occurrencesHtml}
-                                </div>
-                            </div>
-                        `;
-                    }).join('');
-                
-                document.getElementById(`lossSummary${lineNum}`).innerHTML = 
-                    lossSummaryHtml || '<p class="text-muted">No losses recorded</p>';
-            });
+            dailyEntries = new Map(entries.map(entry => [entry.id, entry]));
+            renderDailySummary();
         } catch (error) {
             console.error('Error:', error);
-            alert('Failed to update summary');
+            if (!quiet) {
+                alert('Failed to update summary');
+            }
+        }
+    }
+
+    // Refetch the summary periodically when there is no live feed
+    function startPolling() {
+        updateDailySummary();
+        setInterval(() => updateDailySummary(true), parseInt(document.body.dataset.pollSeconds) * 1000);
+    }
+
+    // Subscribe to the server-sent event feed for today's entries, if the server offers it
+    function connectLiveFeed() {
+        if (!window.EventSource || document.body.dataset.liveFeed !== 'true') {
+            return false;
         }
+        
+        liveFeed = new EventSource('/api/stream/daily');
+        liveFeed.addEventListener('snapshot', e => applySnapshot(JSON.parse(e.data)));
+        liveFeed.addEventListener('entry-added', e => applyEntryEvent(JSON.parse(e.data)));
+        liveFeed.addEventListener('entry-updated', e => applyEntryEvent(JSON.parse(e.data)));
+        liveFeed.addEventListener('error', () => {
+            // A refused stream (503 when the worker is at its limit) isn't retried by the browser
+            if (liveFeed.readyState === EventSource.CLOSED) {
+                liveFeed = null;
+                startPolling();
+            }
+        });
+        return true;
     }
 
     // Function to generate reports
-    window.generateReport = function(type) {
-        window.open(`/api/report/${type}`, '_blank');
+    window.generateReport = async function(type) {
+        // Open the window now so the download isn't treated as a popup later
+        const reportWindow = window.open('', '_blank');
+        
+        try {
+            const response = await fetch('/api/report-jobs', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ report_type: type })
+            });
+            if (!response.ok) {
+                throw new Error('Failed to start report');
+            }
+            
+            let job = await response.json();
+            while (job.status === 'pending') {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                const statusResponse = await fetch(job.status_url);
+                if (!statusResponse.ok) {
+                    throw new Error('Failed to check report status');
+                }
+                job = await statusResponse.json();
+            }
+            
+            if (job.status !== 'done') {
+                throw new Error(job.error || 'Report generation failed');
+            }
+            
+            if (reportWindow) {
+                reportWindow.location = job.download_url;
+            } else {
+                window.location = job.download_url;
+            }
+        } catch (error) {
+            console.error('Error:', error);
+            if (reportWindow) {
+                reportWindow.close();
+            }
+            alert(error.message);
+        }
     }
 
     // Initial load
-    updateDailySummary();
+    if (!connectLiveFeed()) {
+        startPolling();
+    }
 });
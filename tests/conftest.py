@@ -0,0 +1,47 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app.py reads its configuration from the environment when it is imported, so point it at
+# a scratch directory first. Values set here win over a developer's .env file.
+DATA_DIR = tempfile.mkdtemp(prefix='planvsactual-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(DATA_DIR, 'test.db')}"
+os.environ['REPORT_CACHE_DIR'] = os.path.join(DATA_DIR, 'reports')
+os.environ['ARCHIVE_DIR'] = os.path.join(DATA_DIR, 'archive')
+
+import app as planvsactual
+
+def pytest_addoption(parser):
+    parser.addoption('--run-slow', action='store_true', help='Also run tests marked slow (minutes each)')
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: takes minutes; only runs with --run-slow')
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--run-slow'):
+        return
+    skip_slow = pytest.mark.skip(reason='slow, run with --run-slow')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip_slow)
+
+@pytest.fixture
+def app_module():
+    """The app module with a freshly initialized, empty database and an app context."""
+    for directory in ('ARCHIVE_DIR', 'REPORT_CACHE_DIR'):
+        shutil.rmtree(planvsactual.app.config[directory], ignore_errors=True)
+    with planvsactual.app.app_context():
+        planvsactual.db.drop_all()
+        assert planvsactual.init_db()
+        yield planvsactual
+        planvsactual.db.session.remove()
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,45 @@
+import pytest
+
+def payload(**overrides):
+    data = {
+        'line_number': 1,
+        'from_time': '08:00',
+        'to_time': '08:59',
+        'shift_date': '2025-03-03',
+        'planned': 100,
+        'actual': 90,
+        'total_loss_time': 10,
+        'losses': [{'reason': 'Breakdown', 'loss_time': 10, 'remarks': 'jam'}]
+    }
+    data.update(overrides)
+    return data
+
+def test_add_entry(app_module, client):
+    response = client.post('/api/entry', json=payload())
+
+    assert response.status_code == 200, response.get_json()
+    entry = client.get(f"/api/entry/{response.get_json()['id']}").get_json()
+    assert (entry['planned'], entry['actual'], entry['shift_date']) == (100, 90, '2025-03-03')
+    assert [loss['reason'] for loss in entry['losses']] == ['Breakdown']
+
+@pytest.mark.parametrize('data', [
+    payload(planned='abc'),
+    payload(line_number='1'),
+    payload(line_number=99),
+    payload(from_time='8 o\'clock'),
+    payload(losses=[{'reason': 'Breakdown'}]),
+    {key: value for key, value in payload().items() if key != 'actual'},
+    [payload()],
+])
+def test_add_entry_rejects_invalid_payloads(app_module, client, data):
+    response = client.post('/api/entry', json=data)
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert app_module.ProductionEntry.query.count() == 0
+    assert client.get('/api/analytics').status_code == 200
+
+def test_add_entry_requires_json(app_module, client):
+    response = client.post('/api/entry', data='line_number=1')
+
+    assert response.status_code == 400
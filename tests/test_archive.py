@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+
+MONTH = date(2024, 1, 1)
+
+def entry(day, hour, planned=100, losses=()):
+    return {
+        'line_number': 1,
+        'from_time': f'{hour:02d}:00',
+        'to_time': f'{hour:02d}:59',
+        'shift_date': date(2024, 1, day).isoformat(),
+        'planned': planned,
+        'actual': 90,
+        'total_loss_time': sum(loss['loss_time'] for loss in losses),
+        'losses': list(losses)
+    }
+
+def add_entries(client, rows):
+    response = client.post('/api/entries/bulk', json=rows)
+    assert response.status_code == 200, response.get_json()
+
+def entry_ids(client):
+    response = client.get('/api/entries?start=2024-01-01&end=2024-01-31&limit=500')
+    assert response.status_code == 200
+    return [row['id'] for row in response.get_json()['entries']]
+
+@pytest.fixture
+def archived_month(app_module, client):
+    """January 2024 archived with two entries, plus a late third entry still in the table."""
+    loss = {'reason': 'Breakdown', 'loss_time': 5, 'remarks': 'jam'}
+    add_entries(client, [entry(2, 8, losses=[loss]), entry(3, 8)])
+    assert app_module.archive_month(MONTH) == 2
+    add_entries(client, [entry(4, 8, losses=[loss])])
+    assert entry_ids(client) == [1, 2, 3]
+    return app_module
+
+def test_rerun_picks_up_late_entries(archived_month, client):
+    assert archived_month.archive_month(MONTH) == 1
+
+    assert entry_ids(client) == [1, 2, 3]
+    assert archived_month.ProductionEntry.query.count() == 0
+    assert archived_month.check_daily_summaries() == []
+
+def test_failed_delete_leaves_the_archive_unchanged(archived_month, client, monkeypatch):
+    archive_record = archived_month.archive_record
+    monkeypatch.setattr(archived_month, 'archive_record', lambda entry: dict(archive_record(entry), version=-1))
+
+    with pytest.raises(RuntimeError, match='changed while archiving'):
+        archived_month.archive_month(MONTH)
+
+    assert entry_ids(client) == [1, 2, 3]
+    assert archived_month.check_daily_summaries() == []
+
+def test_failed_commit_restores_the_archive(archived_month, client, monkeypatch):
+    def fail():
+        raise RuntimeError('commit failed')
+    monkeypatch.setattr(archived_month.db.session, 'commit', fail)
+
+    with pytest.raises(RuntimeError, match='commit failed'):
+        archived_month.archive_month(MONTH)
+    monkeypatch.undo()
+
+    assert entry_ids(client) == [1, 2, 3]
+    assert archived_month.check_daily_summaries() == []
+    assert archived_month.archive_month(MONTH) == 1
+    assert entry_ids(client) == [1, 2, 3]
@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import update
+
+@pytest.fixture
+def feed(app_module, monkeypatch):
+    # The watcher thread only sleeps; the tests drive it with poll()
+    monkeypatch.setitem(app_module.app.config, 'STREAM_POLL_SECONDS', 3600)
+    feed = app_module.DailyFeed()
+    monkeypatch.setattr(app_module, 'daily_feed', feed)
+    return feed
+
+def add_entry(client, shift_date, hour, line_number=1):
+    response = client.post('/api/entry', json={
+        'line_number': line_number,
+        'from_time': f'{hour:02d}:00',
+        'to_time': f'{hour:02d}:59',
+        'shift_date': shift_date.isoformat(),
+        'planned': 100,
+        'actual': 90
+    })
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['id']
+
+def foreign_write(app_module, day, line_number):
+    """Bump a rollup row the way a write committed by another worker would."""
+    DailyLineSummary = app_module.DailyLineSummary
+    app_module.db.session.execute(
+        update(DailyLineSummary)
+        .where(DailyLineSummary.line_number == line_number, DailyLineSummary.summary_date == day)
+        .values(version=DailyLineSummary.version + 1)
+    )
+    app_module.db.session.commit()
+
+def subscribe(app_module, feed, today):
+    subscriber = feed.subscribe(today, app_module.today_summary_versions(today))
+    app_module.db.session.remove()
+    return subscriber
+
+def test_local_writes_publish_events_without_a_snapshot(app_module, client, feed):
+    today = date.today()
+    add_entry(client, today, 6)
+    subscriber = subscribe(app_module, feed, today)
+
+    add_entry(client, today, 7)
+    add_entry(client, today, 7, line_number=2)
+
+    assert subscriber.get_nowait().startswith('event: entry-added')
+    assert subscriber.get_nowait().startswith('event: entry-added')
+    assert feed.poll() is None
+
+def test_foreign_write_after_moving_an_entry_into_today(app_module, client, feed):
+    today = date.today()
+    moved_id = add_entry(client, today - timedelta(days=1), 8)
+    add_entry(client, today, 10)
+    subscriber = subscribe(app_module, feed, today)
+
+    response = client.patch(f'/api/entry/{moved_id}', json={'shift_date': today.isoformat()})
+    assert response.status_code == 200, response.get_json()
+    assert subscriber.get_nowait().startswith('event: entry-updated')
+    assert feed.poll() is None
+
+    foreign_write(app_module, today, 1)
+    assert feed.poll().startswith('event: snapshot')
+
+def test_foreign_write_after_a_poll_between_commit_and_publish(app_module, client, feed):
+    today = date.today()
+    add_entry(client, today, 6)
+    subscribe(app_module, feed, today)
+
+    # Commit a local write, let the watcher see it, and only then publish it
+    publish = feed.publish
+    polled = []
+    def late_publish(*args):
+        polled.append(feed.poll())
+        publish(*args)
+    feed.publish = late_publish
+    add_entry(client, today, 7)
+
+    assert polled[0].startswith('event: snapshot')
+    foreign_write(app_module, today, 1)
+    assert feed.poll().startswith('event: snapshot')
+
+def test_foreign_write_before_a_local_write(app_module, client, feed):
+    today = date.today()
+    add_entry(client, today, 6)
+    subscribe(app_module, feed, today)
+
+    foreign_write(app_module, today, 1)
+    add_entry(client, today, 7)
+
+    assert feed.poll().startswith('event: snapshot')
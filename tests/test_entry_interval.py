@@ -0,0 +1,36 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+NIGHT_SHIFTS = [
+    {'name': 'Day', 'start': '06:00', 'end': '22:00'},
+    {'name': 'Night', 'start': '22:00', 'end': '06:00'}
+]
+
+@pytest.mark.parametrize('now, from_time, to_time, expected', [
+    # Already under way or just finished
+    (datetime(2025, 5, 5, 14, 30), time(14, 0), time(15, 0), (datetime(2025, 5, 5, 14, 0), 'Day', date(2025, 5, 5))),
+    (datetime(2025, 5, 5, 14, 30), time(20, 0), time(21, 0), (datetime(2025, 5, 4, 20, 0), 'Day', date(2025, 5, 4))),
+    # Upcoming within ENTRY_UPCOMING_MINUTES
+    (datetime(2025, 5, 5, 14, 30), time(15, 0), time(16, 0), (datetime(2025, 5, 5, 15, 0), 'Day', date(2025, 5, 5))),
+    (datetime(2025, 5, 5, 21, 30), time(22, 0), time(23, 0), (datetime(2025, 5, 5, 22, 0), 'Night', date(2025, 5, 5))),
+    # Upcoming just past midnight belongs to tonight's night shift
+    (datetime(2025, 5, 5, 23, 30), time(0, 0), time(1, 0), (datetime(2025, 5, 6, 0, 0), 'Night', date(2025, 5, 5))),
+    (datetime(2025, 5, 5, 23, 30), time(1, 0), time(2, 0), (datetime(2025, 5, 6, 1, 0), 'Night', date(2025, 5, 5))),
+    # Past midnight, the hour before midnight is still the night shift started yesterday
+    (datetime(2025, 5, 6, 0, 30), time(23, 0), time(0, 0), (datetime(2025, 5, 5, 23, 0), 'Night', date(2025, 5, 5))),
+    # Beyond the window, the interval is yesterday's
+    (datetime(2025, 5, 5, 23, 30), time(2, 0), time(3, 0), (datetime(2025, 5, 5, 2, 0), 'Night', date(2025, 5, 4))),
+])
+def test_entry_interval_with_night_shift(app_module, now, from_time, to_time, expected):
+    start_at, end_at, shift, shift_date = app_module.entry_interval(from_time, to_time, NIGHT_SHIFTS, now=now)
+
+    assert (start_at, shift, shift_date) == expected
+    assert end_at - start_at == timedelta(hours=1)
+
+def test_entry_interval_without_calendar_wraps_past_midnight(app_module):
+    start_at, _, shift, shift_date = app_module.entry_interval(
+        time(0, 0), time(1, 0), now=datetime(2025, 5, 5, 23, 30)
+    )
+
+    assert (start_at, shift, shift_date) == (datetime(2025, 5, 6, 0, 0), None, date(2025, 5, 6))
@@ -0,0 +1,83 @@
+from sqlalchemy import event
+
+LOSSES = [
+    {'reason': 'Breakdown', 'loss_time': 10, 'remarks': 'jam'},
+    {'reason': 'Changeover', 'loss_time': 5, 'remarks': ''}
+]
+
+def payload(**overrides):
+    data = {
+        'line_number': 1,
+        'from_time': '08:00',
+        'to_time': '08:59',
+        'shift_date': '2025-03-03',
+        'planned': 100,
+        'actual': 85,
+        'total_loss_time': 15,
+        'losses': LOSSES
+    }
+    data.update(overrides)
+    return data
+
+def add_entry(client, **overrides):
+    response = client.post('/api/entry', json=payload(**overrides))
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['id']
+
+def writes_during(app_module, request):
+    """Run request() and return the INSERT/UPDATE/DELETE statements it issued."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(None, 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            statements.append(statement)
+
+    engine = app_module.db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = request()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200, response.get_json()
+    return statements
+
+def test_unchanged_put_writes_nothing(app_module, client):
+    entry_id = add_entry(client)
+
+    writes = writes_during(app_module, lambda: client.put(f'/api/entry/{entry_id}', json=payload()))
+
+    assert writes == []
+    assert client.get(f'/api/entry/{entry_id}').get_json()['version'] == 1
+
+def test_changing_actual_upserts_the_rollup_once(app_module, client):
+    entry_id = add_entry(client)
+
+    writes = writes_during(app_module, lambda: client.patch(f'/api/entry/{entry_id}', json={'actual': 90}))
+
+    assert len([statement for statement in writes if 'daily_line_summary' in statement]) == 1
+    assert not [statement for statement in writes if 'daily_loss_summary' in statement]
+    assert app_module.check_daily_summaries() == []
+
+def test_changing_one_loss_only_touches_its_reason(app_module, client):
+    entry_id = add_entry(client)
+    losses = [dict(LOSSES[0], loss_time=12), LOSSES[1]]
+
+    writes = writes_during(app_module, lambda: client.patch(
+        f'/api/entry/{entry_id}', json={'losses': losses, 'total_loss_time': 17}
+    ))
+
+    loss_upserts = [statement for statement in writes if 'daily_loss_summary' in statement]
+    assert len(loss_upserts) == 1
+    assert app_module.check_daily_summaries() == []
+    rows = app_module.db.session.query(app_module.DailyLossSummary.reason, app_module.DailyLossSummary.loss_time).all()
+    assert sorted(rows) == [('Breakdown', 12), ('Changeover', 5)]
+
+def test_moving_an_entry_keeps_both_days_in_step(app_module, client):
+    entry_id = add_entry(client)
+    add_entry(client, from_time='09:00', to_time='09:59')
+
+    writes_during(app_module, lambda: client.patch(
+        f'/api/entry/{entry_id}', json={'shift_date': '2025-03-04', 'line_number': 2, 'actual': 80}
+    ))
+
+    assert app_module.check_daily_summaries() == []
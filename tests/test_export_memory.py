@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+
+# 10 lines x 1000 days x 100 entries a day, without losses: one export row per entry
+LINES = 10
+DAYS = 1000
+ENTRIES_PER_DAY = 100
+EXPORT_ROWS = LINES * DAYS * ENTRIES_PER_DAY
+
+# Growth of peak RSS over the process's RSS before the export started. Streaming stays
+# within a few MB; holding the rows in memory would take hundreds.
+RSS_CEILING_MB = 50
+
+@pytest.mark.slow
+def test_million_row_export_stays_under_rss_ceiling(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'export.db'}"
+    env = dict(os.environ, DATABASE_URL=database_url, REPORT_CACHE_DIR=str(tmp_path / 'reports'))
+
+    # Seed in one interpreter and export in a fresh one, so the peak RSS is the export's own
+    subprocess.run([
+        sys.executable, os.path.join(BENCHMARKS_DIR, 'seed.py'), '--database-url', database_url,
+        '--lines', str(LINES), '--days', str(DAYS), '--entries-per-day', str(ENTRIES_PER_DAY),
+        '--losses-per-entry', '0'
+    ], env=env, cwd=tmp_path, check=True)
+    output = tmp_path / 'export.json'
+    subprocess.run([
+        sys.executable, os.path.join(BENCHMARKS_DIR, 'inprocess.py'), 'export', '--output', str(output)
+    ], env=env, cwd=tmp_path, check=True)
+    result = json.loads(output.read_text())
+
+    assert result['csv']['rows'] == EXPORT_ROWS
+    assert result['ndjson']['rows'] == EXPORT_ROWS
+    assert result['peak_rss_mb'] - result['rss_before_mb'] < RSS_CEILING_MB, result
@@ -0,0 +1,101 @@
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+FIRST_DAY = date(2025, 3, 3)
+REASONS = ['Breakdown', 'Changeover', 'Material shortage', 'Quality check']
+
+def add_entries(client, count, offset=0):
+    """Post count entries on lines 1 and 2, one hour each, spread over consecutive days."""
+    rng = random.Random(offset)
+    rows = []
+    for index in range(offset, offset + count):
+        hour = (index // 2) % 24
+        losses = [
+            {'reason': rng.choice(REASONS), 'loss_time': rng.randint(1, 15), 'remarks': f'loss {index}'}
+            for _ in range(rng.randint(0, 3))
+        ]
+        rows.append({
+            'line_number': 1 + index % 2,
+            'from_time': f'{hour:02d}:00',
+            'to_time': f'{hour:02d}:59',
+            'shift_date': (FIRST_DAY + timedelta(days=index // 48)).isoformat(),
+            'planned': rng.randint(80, 120),
+            'actual': rng.randint(50, 100),
+            'total_loss_time': sum(loss['loss_time'] for loss in losses),
+            'losses': losses
+        })
+    response = client.post('/api/entries/bulk', json=rows)
+    assert response.status_code == 200, response.get_json()
+
+def reference_report_data(app_module, start_date, end_date):
+    """The report computed entry by entry, walking each entry's lazily loaded losses."""
+    ProductionEntry = app_module.ProductionEntry
+    entries = ProductionEntry.query.filter(
+        app_module.shift_date_in_days(start_date, end_date)
+    ).order_by(ProductionEntry.line_number, ProductionEntry.start_at, ProductionEntry.id).all()
+
+    report_data = {line_number: {} for line_number in app_module.line_names()}
+    for entry in entries:
+        daily_data = report_data[entry.line_number].setdefault(entry.shift_date, {
+            'planned': 0,
+            'actual': 0,
+            'total_loss_time': 0,
+            'losses': {}
+        })
+        daily_data['planned'] += entry.planned
+        daily_data['actual'] += entry.actual
+        daily_data['total_loss_time'] += entry.total_loss_time
+        for loss in sorted(entry.losses, key=lambda loss: loss.id):
+            loss_data = daily_data['losses'].setdefault(loss.reason, {'total_time': 0, 'occurrences': []})
+            loss_data['total_time'] += loss.loss_time
+            loss_data['occurrences'].append({
+                'time_range': f"{entry.from_time.strftime('%H:%M')}-{entry.to_time.strftime('%H:%M')}",
+                'loss_time': loss.loss_time,
+                'remarks': loss.remarks
+            })
+    return report_data
+
+def report_with_query_count(app_module, start_date, end_date):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = app_module.db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        report_data = app_module.generate_report_data(start_date, end_date)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return report_data, len(statements)
+
+def test_report_query_count_does_not_grow_with_entries(app_module, client):
+    end_date = FIRST_DAY + timedelta(days=6)
+
+    add_entries(client, 10)
+    small, small_queries = report_with_query_count(app_module, FIRST_DAY, end_date)
+    add_entries(client, 300, offset=10)
+    large, large_queries = report_with_query_count(app_module, FIRST_DAY, end_date)
+
+    assert sum(len(days) for days in large.values()) > sum(len(days) for days in small.values())
+    assert 0 < large_queries == small_queries
+
+def test_report_data_matches_per_entry_computation(app_module, client):
+    add_entries(client, 200)
+    start_date, end_date = FIRST_DAY + timedelta(days=1), FIRST_DAY + timedelta(days=3)
+
+    report_data = app_module.generate_report_data(start_date, end_date)
+
+    assert report_data == reference_report_data(app_module, start_date, end_date)
+    assert any(day['losses'] for days in report_data.values() for day in days.values())
+
+def test_report_data_filters_lines(app_module, client):
+    add_entries(client, 100)
+    end_date = FIRST_DAY + timedelta(days=6)
+
+    report_data = app_module.generate_report_data(FIRST_DAY, end_date, [2])
+
+    assert list(report_data) == [2]
+    assert report_data[2] == reference_report_data(app_module, FIRST_DAY, end_date)[2]
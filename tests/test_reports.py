@@ -0,0 +1,38 @@
+import threading
+import time
+
+def test_concurrent_report_requests_share_one_render(app_module, monkeypatch):
+    renders = []
+    render_pdf = app_module.render_pdf
+
+    def slow_render(*args):
+        renders.append(args)
+        time.sleep(0.2)
+        return render_pdf(*args)
+    monkeypatch.setattr(app_module, 'render_pdf', slow_render)
+
+    responses = []
+    def fetch():
+        with app_module.app.test_client() as client:
+            response = client.get('/api/report/weekly')
+            responses.append((response.status_code, response.mimetype, response.data[:5]))
+            response.close()
+
+    threads = [threading.Thread(target=fetch) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert responses == [(200, 'application/pdf', b'%PDF-')] * 6
+    assert len(renders) == 1
+
+def test_report_render_failure(app_module, client, monkeypatch):
+    def broken_render(*args):
+        raise RuntimeError('out of paper')
+    monkeypatch.setattr(app_module, 'render_pdf', broken_render)
+
+    response = client.get('/api/report/daily')
+
+    assert response.status_code == 500
+    assert 'out of paper' in response.get_json()['error']